@@ -1,32 +1,66 @@
 import streamlit as st
 from st_files_connection import FilesConnection
+from parquet_utils import cached_filesystem, csv_to_parquet, read_parquet
 import matplotlib.pyplot as plt
 import seaborn as sns
-import plotly.express as px
+from summaries import categorical_summary, choropleth
+from refresh_scheduler import get_scheduler
 
 st.title(':orange[Streamlit + AWS S3 Connection]')
 
-# Create a connection object and retrieve file contents.
-# Specify the input format as a "csv" and cache the result for 600 seconds.
+# Create a connection object.
 conn = st.connection('s3', type=FilesConnection)
-df = conn.read("st-aws-connect-bucket/data-science-salaries-1.csv", input_format="csv", ttl=600)
+csv_path = "st-aws-connect-bucket/data-science-salaries-1.csv"
+parquet_path = "st-aws-connect-bucket/data-science-salaries-1.parquet"
+
+# Range requests through a local block cache, shared by all sessions.
+@st.cache_resource
+def get_filesystem():
+    return cached_filesystem(conn.fs)
+
+# Only the requested columns (and row groups) of the Parquet file are read.
+# The scheduler re-reads each (path, columns) combination every few minutes,
+# so reruns seldom wait for S3. Returns (data, version).
+def load_parquet(path, columns=None, n_rows=None):
+    fs = get_filesystem()
+    return get_scheduler().get_versioned(('s3', path, repr(columns), n_rows),
+                                         lambda: read_parquet(fs, path, columns, n_rows=n_rows), ttl=600)
+
+if conn.fs.exists(parquet_path):
+    path = parquet_path
+    preview, _ = load_parquet(path, n_rows=5)
+    df, version = load_parquet(path, columns=["company location"])
+else:
+    # Specify the input format as a "csv" and cache the result for 600 seconds.
+    path = csv_path
+    df = conn.read(path, input_format="csv", ttl=600)
+    preview = df.head(5)
+    version = path
+
+    st.info("Reading the whole CSV file. Convert it once to Parquet to only read the columns in use.",
+            icon="ℹ️")
+    if st.button("🗜️ Convert to Parquet"):
+        csv_to_parquet(conn.fs, csv_path, parquet_path)
+        st.rerun()
 
 st.header('Our Data 👀')
-st.dataframe(df.head(5))
+st.dataframe(preview)
 st.write("---")
 
+# Counted once per file and shared by all the charts below
+location_counts = categorical_summary(df["company location"], "company location", version)
+
 st.subheader("Company's Origins")
-data = df['company location'].value_counts().index[:11]
+data = location_counts[:11]
 sns_fig = plt.figure(figsize=(18,10))
-sns.countplot(x=df["company location"], order=data)
+sns.barplot(x=data.index, y=data.values, order=data.index)
 st.pyplot(sns_fig)
 
 st.subheader("Companies in North America 🌎")
-chart = px.choropleth(data_frame = df["company location"].value_counts(),
-                    locations=df["company location"].value_counts().index,
-                    locationmode="country names", 
-                    color=df["company location"].value_counts().values,
-                    height= 600,scope="north america",
-                    labels={"color":"Company","locations":"Country"})
+chart = choropleth(location_counts, scope="north america",
+                   labels={"color":"Company","locations":"Country"})
 
 st.plotly_chart(chart)
+
+with st.sidebar.expander("Background refresh"):
+    st.json(get_scheduler().status())
@@ -0,0 +1,49 @@
+from typing import Optional, Sequence
+import fsspec
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+
+def cached_filesystem(fs, cache_dir: str = "./s3_cache", block_size: int = 2**20,
+                      expiry_time: int = 600):
+    """
+    Wraps a remote filesystem (e.g. `conn.fs` of a FilesConnection) so that
+    reads are done with range requests of `block_size` bytes and every block
+    fetched is kept on the local disk for later reruns.
+
+    Cached blocks are dropped when the remote file changes (`check_files`
+    compares its metadata on open) and after `expiry_time` seconds, so a
+    refresh or a rewritten object never reads stale blocks.
+    """
+    return fsspec.filesystem(
+        "blockcache", fs=fs, cache_storage=cache_dir, block_size=block_size,
+        check_files=True, expiry_time=expiry_time,
+    )
+
+
+def csv_to_parquet(fs, csv_path: str, parquet_path: str, row_group_size: int = 100_000):
+    """
+    One-time conversion of a CSV file to Parquet on the same filesystem.
+    Small row groups let later reads skip the groups a filter rules out.
+    """
+    with fs.open(csv_path, "rb") as f:
+        table = pv.read_csv(f)
+
+    with fs.open(parquet_path, "wb") as f:
+        pq.write_table(table, f, row_group_size=row_group_size, compression="zstd")
+
+
+def read_parquet(fs, path: str, columns: Optional[Sequence[str]] = None,
+                 filters: Optional[list] = None, n_rows: Optional[int] = None):
+    """
+    Reads only `columns` of the row groups that can match `filters`
+    (e.g. `[("work_year", "=", 2023)]`) and returns a DataFrame.
+    Pass `n_rows` to only read the first row group, for a preview.
+    """
+    if n_rows is not None:
+        with fs.open(path, "rb") as f:
+            table = pq.ParquetFile(f).read_row_group(0, columns=columns)
+        return table.slice(0, n_rows).to_pandas()
+
+    table = pq.read_table(path, columns=columns, filters=filters, filesystem=fs)
+    return table.to_pandas()
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+
+def count_categories(values: pd.Series) -> pd.Series:
+    """
+    Same result as `values.value_counts()`, computed with a single
+    `np.bincount` over the categorical codes instead of hashing every value.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes, categories = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        codes, categories = pd.factorize(values)
+
+    counts = np.bincount(codes[codes >= 0], minlength=len(categories))
+    summary = pd.Series(counts, index=pd.Index(categories, name=values.name), name="count")
+    return summary[summary > 0].sort_values(ascending=False, kind="stable")
+
+
+# The leading underscore tells st.cache_data not to hash the (large) values,
+# so the cache is keyed on the column name and the dataset version only.
+@st.cache_data(ttl=600)
+def categorical_summary(_values, column: str, version) -> pd.Series:
+    """
+    Counts of each category of `column`, computed once per dataset `version`
+    (e.g. the time the data was loaded) and shared by every chart on the page.
+    `_values` is a pandas Series or an Arrow column: an Arrow column is only
+    dictionary-encoded here, on a cache miss.
+    """
+    if not isinstance(_values, pd.Series):
+        _values = _values.dictionary_encode().to_pandas().rename(column)
+    return count_categories(_values)
+
+
+def choropleth(counts: pd.Series, scope: str, labels: dict):
+    """
+    Builds a country choropleth from precomputed category counts.
+    """
+    return px.choropleth(data_frame=counts,
+                         locations=counts.index,
+                         locationmode="country names",
+                         color=counts.values,
+                         height=600, scope=scope,
+                         labels=labels)
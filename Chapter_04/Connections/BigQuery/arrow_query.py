@@ -0,0 +1,27 @@
+import pyarrow as pa
+
+
+def fetch_arrow(client, query: str) -> pa.Table:
+    """
+    Runs the query and fetches the result as Arrow record batches,
+    without converting any row to a Python object.
+    """
+    return client.query(query).result().to_arrow()
+
+
+def to_ipc(table: pa.Table) -> bytes:
+    """
+    Serializes a table to the Arrow IPC stream format. Bytes are cheap for
+    st.cache_data to hash and copy, unlike a list of dicts.
+    """
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def from_ipc(data: bytes) -> pa.Table:
+    """
+    Reads a table back from the Arrow IPC stream format (zero-copy).
+    """
+    return pa.ipc.open_stream(pa.py_buffer(data)).read_all()
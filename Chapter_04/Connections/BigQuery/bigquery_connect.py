@@ -1,10 +1,11 @@
 import streamlit as st
-import pandas as pd
 from google.oauth2 import service_account
 from google.cloud import bigquery
 import matplotlib.pyplot as plt
 import seaborn as sns
-import plotly.express as px
+from arrow_query import fetch_arrow, to_ipc, from_ipc
+from summaries import categorical_summary, choropleth
+from refresh_scheduler import get_scheduler
 
 st.title(':violet[Streamlit + BigQuery Connection]')
 
@@ -15,49 +16,43 @@ credentials = service_account.Credentials.from_service_account_info(
 client = bigquery.Client(credentials=credentials)
 
 # Perform query.
-# Uses st.cache_data to only rerun when the query changes or after 10 min.
-@st.cache_data(ttl=600)
+# The result is kept in Arrow IPC form, keyed by the SQL text. The query is
+# re-run on a scheduler thread, so reruns don't wait for BigQuery.
+# Returns (data, version).
 def run_query(query):
-    query_job = client.query(query)
-    rows_raw = query_job.result()
-  
-    # Convert to a list of dicts. Required for st.cache_data to hash the return value.
-    rows = [dict(row) for row in rows_raw]
-    return rows
+    return get_scheduler().get_versioned(('bigquery', query),
+                                         lambda: to_ipc(fetch_arrow(client, query)), ttl=600)
 
 
-rows = run_query("SELECT * FROM `aerial-form-397913.ds_salaries.ds_salary_details` LIMIT 15;")
+# One query feeds both the table preview and the aggregations below
+query = "SELECT * FROM `aerial-form-397913.ds_salaries.ds_salary_details`;"
+data, version = run_query(query)
+table = from_ipc(data)
 
 st.header("Our Data 👀")
-st.dataframe(rows)
+st.dataframe(table.slice(0, 15).to_pandas())
 st.write("---")
 
-# Uses pandas-gbq package to read the data directly from the CSV file
-query = "SELECT employee_residence FROM `aerial-form-397913.ds_salaries.ds_salary_details`;"
-df = pd.read_gbq(query, credentials=credentials)
+# Counted once per query result and shared by all the charts below
+residence_counts = categorical_summary(table["employee_residence"], "employee_residence", version)
 
 st.header("Employee's Origins 👨‍💼")
-data = df['employee_residence'].value_counts().index[:11]
+data = residence_counts[:11]
 sns_fig = plt.figure(figsize=(20,10))
-sns.countplot(x=df["employee_residence"], order=data)
+sns.barplot(x=data.index, y=data.values, order=data.index)
 st.pyplot(sns_fig)
 
 st.subheader("Data Scientists from North America 🌎")
 
-chart_1 = px.choropleth(data_frame = df["employee_residence"].value_counts(),
-                    locations=df["employee_residence"].value_counts().index,
-                    locationmode="country names", 
-                    color=df["employee_residence"].value_counts().values,
-                    height= 600,scope="north america",
-                    labels={"color":"Data Scientist","locations":"Country"})
+chart_1 = choropleth(residence_counts, scope="north america",
+                     labels={"color":"Data Scientist","locations":"Country"})
 st.plotly_chart(chart_1)
 
 st.subheader("Data Scientists from Europe 🌍")
 
-chart_2 = px.choropleth(data_frame = df["employee_residence"].value_counts(),
-                    locations=df["employee_residence"].value_counts().index,
-                    locationmode="country names", 
-                    color=df["employee_residence"].value_counts().values,
-                    height= 600,scope="europe",
-                    labels={"color":"Data Scientist","locations":"Country"})
+chart_2 = choropleth(residence_counts, scope="europe",
+                     labels={"color":"Data Scientist","locations":"Country"})
 st.plotly_chart(chart_2)
+
+with st.sidebar.expander("Background refresh"):
+    st.json(get_scheduler().status())
@@ -0,0 +1,137 @@
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable
+import streamlit as st
+
+_MISSING = object()
+
+
+@dataclass
+class _Entry:
+    loader: Callable[[], Any]
+    ttl: float
+    result: Any = _MISSING  # (value, loaded_at), swapped as one object
+    next_refresh: float = 0.0
+    last_read: float = field(default_factory=time.time)
+    in_flight: bool = False
+    failures: int = 0
+    first_load: threading.Lock = field(default_factory=threading.Lock)
+
+
+class RefreshScheduler:
+    """
+    Keeps the results of registered loaders warm. Each loader is re-run in the
+    background before its `ttl` runs out (at `refresh_ahead` of the ttl, minus
+    a random `jitter`), and the new result replaces the old one in a single
+    assignment, so readers never wait for a refresh. At most `max_concurrent`
+    loaders refresh at the same time. Keys nobody read for `evict_after`
+    ttl periods are dropped instead of being refreshed forever.
+    """
+    def __init__(self, max_concurrent: int = 2, refresh_ahead: float = 0.8,
+                 jitter: float = 0.1, tick: float = 1.0, evict_after: float = 3):
+        self._refresh_ahead = refresh_ahead
+        self._evict_after = evict_after
+        self._jitter = jitter
+        self._tick = tick
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent,
+                                            thread_name_prefix="refresh")
+        # The thread only holds a weak reference, so dropping the scheduler
+        # (e.g. clearing st.cache_resource) stops it along with the workers
+        self._thread = threading.Thread(target=_run, args=(weakref.ref(self),), daemon=True)
+        self._thread.start()
+        weakref.finalize(self, self._executor.shutdown, wait=False)
+
+    def get(self, key, loader: Callable[[], Any], ttl: float = 600):
+        """
+        Returns the current result for `key`, registering `loader` the first
+        time. Only the very first call waits for the loader to run.
+        """
+        return self.get_versioned(key, loader, ttl)[0]
+
+    def get_versioned(self, key, loader: Callable[[], Any], ttl: float = 600):
+        """
+        Same as `get`, but returns `(value, version)`. The version is the time
+        the value was loaded, so it changes on every refresh and can key the
+        caches of anything computed from the value.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(loader, ttl)
+            entry.last_read = time.time()
+
+        if entry.result is _MISSING:
+            with entry.first_load:
+                if entry.result is _MISSING:
+                    self._store(entry, loader())
+        return entry.result
+
+    def status(self) -> dict:
+        """
+        Age in seconds, seconds until the next refresh and failure count per key.
+        """
+        now = time.time()
+        with self._lock:
+            return {
+                str(key): {
+                    "age_s": round(now - entry.result[1], 1),
+                    "next_refresh_s": round(entry.next_refresh - now, 1),
+                    "failures": entry.failures,
+                }
+                for key, entry in self._entries.items() if entry.result is not _MISSING
+            }
+
+    def _store(self, entry: _Entry, value):
+        now = time.time()
+        delay = entry.ttl * self._refresh_ahead * (1 - random.uniform(0, self._jitter))
+        entry.result = (value, now)  # atomic swap: readers get the old or the new result
+        entry.next_refresh = now + delay
+        entry.failures = 0
+
+    def _refresh(self, entry: _Entry):
+        try:
+            self._store(entry, entry.loader())
+        except Exception:
+            # Keep serving the previous result and retry a bit later
+            entry.failures += 1
+            entry.next_refresh = time.time() + min(entry.ttl * 0.1 * entry.failures, entry.ttl)
+        finally:
+            entry.in_flight = False
+
+    def _submit_due(self):
+        now = time.time()
+        with self._lock:
+            idle = [key for key, entry in self._entries.items()
+                    if now - entry.last_read > entry.ttl * self._evict_after]
+            for key in idle:
+                del self._entries[key]
+            due = [entry for entry in self._entries.values()
+                   if entry.result is not _MISSING and not entry.in_flight
+                   and entry.next_refresh <= now]
+            for entry in due:
+                entry.in_flight = True
+        for entry in due:
+            self._executor.submit(self._refresh, entry)
+
+
+def _run(scheduler_ref):
+    while True:
+        scheduler = scheduler_ref()
+        if scheduler is None:
+            return
+        scheduler._submit_due()
+        tick = scheduler._tick
+        del scheduler
+        time.sleep(tick)
+
+
+# Uses st.cache_resource so every page of the process shares one scheduler.
+@st.cache_resource
+def get_scheduler(max_concurrent: int = 2) -> RefreshScheduler:
+    return RefreshScheduler(max_concurrent=max_concurrent)
@@ -0,0 +1,70 @@
+import functools
+import inspect
+import tempfile
+from pathlib import Path
+import diskcache as dc
+import streamlit as st
+
+# Version counters live on disk so every worker process on the host sees them.
+TAGS_DIR = Path(tempfile.gettempdir()) / "streamlit_cache_tags"
+
+
+@st.cache_resource
+def _tag_store():
+    return dc.Cache(str(TAGS_DIR))
+
+
+def tag_versions(tags) -> tuple:
+    """
+    Returns the current `(tag, version)` pairs for the given tags.
+    """
+    store = _tag_store()
+    return tuple((tag, store.get(tag, 0)) for tag in sorted(tags))
+
+
+def invalidate(*tags):
+    """
+    Invalidates every cached entry that declared one of `tags`, in all
+    processes sharing the tag store. Other cached data is left untouched.
+    """
+    store = _tag_store()
+    for tag in tags:
+        store.incr(tag, default=0)
+
+
+def cache_data(tags, ttl=None, max_entries=None):
+    """
+    Like `st.cache_data`, but entries are also keyed on the versions of their
+    tags, so `invalidate(tag)` makes them miss on the next call.
+
+    `tags` is a list of strings, or a function receiving the call arguments
+    and returning them, e.g. `lambda worksheet: [f"worksheet:{worksheet}"]`.
+    Arguments starting with an underscore are not hashed, as in st.cache_data.
+    """
+    def decorator(func):
+        # The cache key is the function name, the tag versions and the hashable
+        # arguments. The full call (`_call`) is passed along without hashing.
+        def versioned(func_name, versions, hashed_args, _call):
+            return func(*_call.args, **_call.kwargs)
+
+        # st.cache_data identifies a function by its module, qualname and source,
+        # which are the same for every `versioned`: borrow those of `func` so each
+        # decorated function gets its own storage, ttl and max_entries.
+        versioned.__module__ = func.__module__
+        versioned.__qualname__ = f"{func.__qualname__}.<tagged>"
+        versioned = st.cache_data(ttl=ttl, max_entries=max_entries)(versioned)
+
+        func_name = f"{func.__module__}.{func.__qualname__}"
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            call = signature.bind(*args, **kwargs)
+            call.apply_defaults()
+            hashed_args = {name: value for name, value in call.arguments.items()
+                           if not name.startswith("_")}
+            func_tags = tags(*args, **kwargs) if callable(tags) else tags
+            return versioned(func_name, tag_versions(func_tags), hashed_args, call)
+
+        return wrapper
+    return decorator
@@ -3,10 +3,25 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from streamlit_gsheets import GSheetsConnection
+from sheet_sync import read_worksheet, sync_worksheet, invalidate_worksheet
+from local_store import LocalSheetStore
 
 st.title(":blue[Streamlit + Private Google Sheets🔌]")
 
 conn = st.connection("gsheets", type=GSheetsConnection)
+
+# Persistent local DuckDB copy of the worksheets, shared by all sessions
+@st.cache_resource
+def get_local_store():
+    return LocalSheetStore(conn, "sheets.duckdb")
+
+store = get_local_store()
+
+# Writes invalidate the cached reads and mark the local copy as stale
+def worksheet_changed(worksheet):
+    invalidate_worksheet(worksheet)
+    store.mark_stale(worksheet)
+
 df = conn.read(worksheet="data-science-salaries-1")
 
 st.subheader('Glimpse of the Data 👀')
@@ -45,7 +60,7 @@ if st.button("➕ Create new worksheet"):
         worksheet="sheets_conn_demo-1",
         data=df,
     )
-    st.cache_data.clear()
+    worksheet_changed("sheets_conn_demo-1")
     st.rerun()
 
 st.write("---")
@@ -56,10 +71,8 @@ st.info(
     "If the sheet has been deleted, press 'Create new worksheet' button above.",
     icon="ℹ️",
 )
-# Read Google WorkSheet as DataFrame
-df = conn.read(
-    worksheet="sheets_conn_demo-1",
-)
+# Read Google WorkSheet as DataFrame, cached until this worksheet is written to
+df = read_worksheet(conn, "sheets_conn_demo-1")
 
 # Display our Spreadsheet as st.dataframe
 st.dataframe(df)
@@ -80,13 +93,11 @@ df = pd.DataFrame(
         "Purpose": ['Business', 'Leisure', 'Vacation', 'Friends reunion', 'Cultural event', 'Vacation'],
     }
 )
-# Click the button to update the worksheet.
+# Click the button to update the worksheet. Only the changed cells are sent,
+# in a single batched request, and only this worksheet's cache is invalidated.
 if st.button("⚡ Update worksheet"):
-    df = conn.update(
-        worksheet="sheets_conn_demo-1",
-        data=df,
-    )
-    st.cache_data.clear()
+    sync_worksheet(conn, "sheets_conn_demo-1", df)
+    worksheet_changed("sheets_conn_demo-1")
     st.rerun()
 
 # Display our updated Spreadsheet as st.dataframe
@@ -102,10 +113,14 @@ st.info(
 # Make sure worksheet name is in double quota "", DuckDB SQL dialect is supported
 sql = 'select name, age, destination from "sheets_conn_demo-1" order by gender'
 
-df = conn.query(sql=sql, ttl=3600)
+# The query runs on the local DuckDB copy, which is refreshed at most once an hour
+store.ensure_fresh("sheets_conn_demo-1", max_age=3600)
+df = store.query(sql)
 
  # Display our SQL query results as st.dataframe
 st.dataframe(df)
+st.caption("Local copy freshness")
+st.dataframe(store.freshness(), hide_index=True)
 st.write("---")
 
 
@@ -115,7 +130,7 @@ st.subheader("5. Clear Worksheet")
 if st.button("🧹 Clear worksheet"):
     conn.clear(worksheet="sheets_conn_demo-1")
     st.success("Worksheet sheets_conn_demo-1 is now cleared! 👍")
-    st.cache_data.clear()
+    worksheet_changed("sheets_conn_demo-1")
     st.rerun()
 
 st.dataframe(df)
@@ -128,7 +143,7 @@ if st.button("💀 Delete worksheet"):
     spreadsheet = conn.client._open_spreadsheet()  # type: ignore
     worksheet = spreadsheet.worksheet("sheets_conn_demo-1")
     spreadsheet.del_worksheet(worksheet)
-    st.cache_data.clear()
+    worksheet_changed("sheets_conn_demo-1")
     st.rerun()
 
 st.dataframe(df)
@@ -0,0 +1,123 @@
+import tempfile
+import time
+from contextlib import contextmanager
+from hashlib import sha1
+from pathlib import Path
+import diskcache as dc
+import duckdb
+import pandas as pd
+
+# Lock shared by every worker process on the host, as for the cache tags
+LOCKS_DIR = Path(tempfile.gettempdir()) / "streamlit_duckdb_locks"
+
+
+class LocalSheetStore:
+    """
+    A persistent local DuckDB copy of the worksheets of a GSheetsConnection.
+    SQL queries run against the local tables, so they don't download the
+    worksheet again.
+    Each worksheet is stored as a table of the same name, so queries written
+    for GSheetsConnection.query (e.g. `from "sheets_conn_demo-1"`) work as-is.
+
+    DuckDB lets a single process open the file for writing, so every access
+    opens a short-lived connection under a lock shared by all the worker
+    processes on the host.
+    """
+    def __init__(self, conn, path: str = "sheets.duckdb"):
+        self._conn = conn
+        self._path = path
+        self._lock = dc.Lock(dc.Cache(str(LOCKS_DIR)), str(Path(path).resolve()), expire=60)
+        with self._connect() as con:
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS _freshness ("
+                "worksheet VARCHAR PRIMARY KEY, refreshed_at DOUBLE, "
+                "changed_at DOUBLE, n_rows BIGINT, content_hash UBIGINT)"
+            )
+            # Files created before the stale flag existed
+            con.execute("ALTER TABLE _freshness ADD COLUMN IF NOT EXISTS stale BOOLEAN DEFAULT false")
+
+    @contextmanager
+    def _connect(self):
+        with self._lock:
+            con = duckdb.connect(self._path)
+            try:
+                yield con
+            finally:
+                con.close()
+
+    @staticmethod
+    def _last_refresh(con, worksheet: str):
+        return con.execute(
+            "SELECT refreshed_at, content_hash, stale FROM _freshness WHERE worksheet = ?",
+            [worksheet],
+        ).fetchone()
+
+    @staticmethod
+    def _content_hash(df: pd.DataFrame) -> int:
+        # Hash the row hashes in order, so re-sorting the rows counts as a change
+        row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        return int.from_bytes(sha1(row_hashes.tobytes()).digest()[:8], "big")
+
+    def ensure_fresh(self, worksheet: str, max_age: float = 3600) -> bool:
+        """
+        Downloads the worksheet, bypassing the connection's cache, if the local
+        copy is missing, marked stale or older than `max_age` seconds, so the
+        refresh time recorded is the age of the data. The table is only rewritten
+        when the content changed. Returns True if a fetch happened.
+        The download runs outside the lock, so queries aren't blocked by it.
+        """
+        with self._connect() as con:
+            last = self._last_refresh(con, worksheet)
+        if last is not None and not last[2] and time.time() - last[0] < max_age:
+            return False
+
+        df = self._conn.read(worksheet=worksheet, ttl=0)
+        content_hash = self._content_hash(df)
+
+        with self._connect() as con:
+            # Another session or process may have stored the same content meanwhile
+            last = self._last_refresh(con, worksheet)
+            now = time.time()
+
+            if last is None or last[1] != content_hash:
+                con.register("_incoming", df)
+                con.execute(f'CREATE OR REPLACE TABLE "{worksheet}" AS SELECT * FROM _incoming')
+                con.unregister("_incoming")
+                changed_at = now
+            else:
+                changed_at = None
+
+            con.execute(
+                "INSERT INTO _freshness VALUES (?, ?, ?, ?, ?, false) ON CONFLICT (worksheet) DO UPDATE SET "
+                "refreshed_at = excluded.refreshed_at, stale = false, "
+                "changed_at = COALESCE(excluded.changed_at, _freshness.changed_at), "
+                "n_rows = excluded.n_rows, content_hash = excluded.content_hash",
+                [worksheet, now, changed_at, len(df), content_hash],
+            )
+            return True
+
+    def mark_stale(self, worksheet: str):
+        """
+        Forces the next `ensure_fresh` call to fetch the worksheet again.
+        """
+        with self._connect() as con:
+            con.execute(
+                "UPDATE _freshness SET stale = true WHERE worksheet = ?", [worksheet]
+            )
+
+    def query(self, sql: str) -> pd.DataFrame:
+        with self._connect() as con:
+            return con.execute(sql).df()
+
+    def freshness(self) -> pd.DataFrame:
+        """
+        When each worksheet was last checked and last changed, its size, and
+        whether it was written to since.
+        """
+        with self._connect() as con:
+            df = con.execute(
+                "SELECT worksheet, refreshed_at, changed_at, n_rows, stale FROM _freshness"
+            ).df()
+        for column in ("refreshed_at", "changed_at"):
+            df[column] = pd.to_datetime(df[column], unit="s")
+        return df
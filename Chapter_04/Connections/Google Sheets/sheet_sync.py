@@ -0,0 +1,96 @@
+import pandas as pd
+from gspread.utils import rowcol_to_a1
+from cache_tags import cache_data, invalidate
+
+
+#------------------------------------------------
+#----------------------Per-worksheet cache-------
+
+def worksheet_tag(worksheet: str) -> str:
+    return f"worksheet:{worksheet}"
+
+
+def invalidate_worksheet(worksheet: str):
+    """
+    Invalidates the cached reads and queries of one worksheet only.
+    """
+    invalidate(worksheet_tag(worksheet))
+
+
+@cache_data(tags=lambda _conn, worksheet: [worksheet_tag(worksheet)], ttl=3600)
+def read_worksheet(_conn, worksheet: str) -> pd.DataFrame:
+    """
+    Reads a worksheet, cached until `invalidate_worksheet` is called for it.
+    """
+    return _conn.read(worksheet=worksheet, ttl=0)
+
+
+#------------------------------------------------
+#----------------------Diffing-------------------
+
+def _to_cell(value):
+    if pd.isna(value):
+        return ""
+    return value.item() if hasattr(value, "item") else value
+
+
+def diff_ranges(old: pd.DataFrame, new: pd.DataFrame) -> list:
+    """
+    Compares two versions of a worksheet with the same header and returns
+    the changed cells as `{"range": "B3:D3", "values": [[...]]}` updates:
+    one per run of adjacent changed cells in a row. Rows that were removed
+    are blanked out.
+    """
+    n_rows = max(len(old), len(new))
+    old = old.reset_index(drop=True).reindex(range(n_rows)).astype(object)
+    new = new.reset_index(drop=True).reindex(range(n_rows)).astype(object)
+    old, new = old.where(old.notna(), ""), new.where(new.notna(), "")
+
+    changed = (old != new).to_numpy()
+    updates = []
+    for row in changed.any(axis=1).nonzero()[0]:
+        values = new.iloc[row]
+        col = 0
+        while col < len(new.columns):
+            if not changed[row, col]:
+                col += 1
+                continue
+            start = col
+            while col < len(new.columns) and changed[row, col]:
+                col += 1
+            # Row 1 holds the header, so DataFrame row 0 is sheet row 2
+            updates.append({
+                "range": f"{rowcol_to_a1(row + 2, start + 1)}:{rowcol_to_a1(row + 2, col)}",
+                "values": [[_to_cell(value) for value in values.iloc[start:col]]],
+            })
+    return updates
+
+
+def sync_worksheet(conn, worksheet: str, data: pd.DataFrame) -> int:
+    """
+    Writes `data` to the worksheet, sending only the changed cells in one
+    batched request, and invalidates that worksheet's cached reads.
+    Falls back to rewriting the whole worksheet when the header changed.
+    Returns the number of ranges sent.
+
+    The diff is taken against a fresh read, not the cached one, so cells
+    edited in Sheets since the last read are written back too.
+    """
+    old = conn.read(worksheet=worksheet, ttl=0)
+
+    if list(old.columns) != list(data.columns):
+        conn.update(worksheet=worksheet, data=data)
+        invalidate_worksheet(worksheet)
+        return 1
+
+    updates = diff_ranges(old, data)
+    if updates:
+        spreadsheet = conn.client._open_spreadsheet()  # type: ignore
+        sheet = spreadsheet.worksheet(worksheet)
+        # Writes past the end of the grid are rejected: grow it first
+        # (one header row plus the data)
+        if len(data) + 1 > sheet.row_count:
+            sheet.add_rows(len(data) + 1 - sheet.row_count)
+        sheet.batch_update(updates)
+        invalidate_worksheet(worksheet)
+    return len(updates)
@@ -0,0 +1,76 @@
+import threading
+from collections import defaultdict, deque
+import numpy as np
+import pymongo
+from pymongo import monitoring
+import streamlit as st
+
+# Used when the `[mongo]` section of secrets.toml leaves a setting out.
+CLIENT_DEFAULTS = {
+    "maxPoolSize": 20,
+    "minPoolSize": 0,
+    "maxIdleTimeMS": 300_000,
+    "serverSelectionTimeoutMS": 5_000,
+    "connectTimeoutMS": 5_000,
+    "socketTimeoutMS": 30_000,
+}
+
+
+class LatencyListener(monitoring.CommandListener):
+    """
+    Records the duration of the last `maxlen` operations of each command
+    (find, aggregate, getMore...) reported by pymongo, and counts them all.
+    """
+    def __init__(self, maxlen: int = 1000):
+        self._lock = threading.Lock()
+        self._durations = defaultdict(lambda: deque(maxlen=maxlen))
+        self._counts = defaultdict(int)
+        self._failures = defaultdict(int)
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        with self._lock:
+            self._durations[event.command_name].append(event.duration_micros / 1000)
+            self._counts[event.command_name] += 1
+
+    def failed(self, event):
+        with self._lock:
+            self._durations[event.command_name].append(event.duration_micros / 1000)
+            self._counts[event.command_name] += 1
+            self._failures[event.command_name] += 1
+
+    def stats(self) -> dict:
+        """
+        Count, failures, mean and 95th percentile latency (ms) per command.
+        The latencies are those of the last `maxlen` operations only.
+        """
+        with self._lock:
+            snapshot = {name: list(durations) for name, durations in self._durations.items()}
+            counts = dict(self._counts)
+            failures = dict(self._failures)
+        return {
+            name: {
+                "count": counts[name],
+                "failures": failures.get(name, 0),
+                "mean_ms": round(float(np.mean(durations)), 2),
+                "p95_ms": round(float(np.percentile(durations, 95)), 2),
+            }
+            for name, durations in snapshot.items()
+        }
+
+
+# Uses st.cache_resource so every page and session shares one client (and pool).
+@st.cache_resource
+def get_client():
+    """
+    The shared MongoClient, configured from the `[mongo]` section of secrets:
+    `uri` plus any of the pool and timeout settings in CLIENT_DEFAULTS.
+    """
+    settings = {**CLIENT_DEFAULTS, **st.secrets["mongo"]}
+    uri = settings.pop("uri")
+    listener = LatencyListener()
+    client = pymongo.MongoClient(uri, event_listeners=[listener], **settings)
+    client.latency = listener
+    return client
@@ -0,0 +1,38 @@
+from typing import Optional, Sequence
+import pandas as pd
+
+
+def read_preview(collection, n: int = 5) -> pd.DataFrame:
+    """
+    Returns `n` documents with every field they have, except `_id`.
+    """
+    return pd.DataFrame(list(collection.find({}, {"_id": 0}, limit=n)))
+
+
+def load_columns(collection, columns: Sequence[str], filters: Optional[dict] = None,
+                 batch_size: int = 10_000, limit: int = 0) -> pd.DataFrame:
+    """
+    Loads only `columns` of the documents matching `filters` into a DataFrame.
+
+    The projection drops every other field (including `_id`) on the server,
+    and the cursor fetches `batch_size` documents per round trip. Values are
+    appended straight into one list per column, so no intermediate list of
+    dicts is built.
+    """
+    projection = {column: 1 for column in columns}
+    projection["_id"] = 0
+
+    cursor = collection.find(filters or {}, projection, batch_size=batch_size, limit=limit)
+
+    data = {column: [] for column in columns}
+    for doc in cursor:
+        for column, values in data.items():
+            values.append(doc.get(column))
+
+    df = pd.DataFrame(data)
+
+    # Repeated strings take far less memory as categoricals
+    for column in columns:
+        if df[column].dtype == object:
+            df[column] = df[column].astype("category")
+    return df
@@ -1,75 +1,113 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
 import seaborn as sns
-import pymongo
+from aggregations import Aggregation, mongo_aggregate
+from mongo_loader import load_columns, read_preview
+from mongo_connection import get_client
+from refresh_scheduler import get_scheduler
+from chart_cache import chart
+from density import density_summary, draw_violins, draw_histogram
+import vega_charts as vega
 
 st.title(':green[Streamlit + MongoDB Connection]🔌')
 
-# Uses st.cache_resource to only run once.
-@st.cache_resource
-def init_connection(): # Replace <password> with yours in the connection string
-    return pymongo.MongoClient("mongodb+srv://shru-mongo:<password>@cluster0.z3fbunv.mongodb.net/?retryWrites=true&w=majority&appName=AtlasApp")
+# The Vega-Lite charts only ship the density curves and the aggregates to the page.
+client_side = st.sidebar.toggle("Render charts in the browser", value=True)
 
-client = init_connection()
+# One client, shared by every page and session. The connection string and the
+# pool/timeout settings are read from the [mongo] section of secrets.toml.
+client = get_client()
 
-# Pull data from the collection.
-# Uses st.cache_data to only rerun when the query changes or after 10 min.
+# Pull only the needed fields of the matching documents from the collection.
+# Each (fields, filters) read is registered once and re-fetched in the background.
+def get_data(columns, filters=None, limit=0):
+    collection = client["Salaries"]["ds_salary_details"]
+    key = ('mongo', columns, repr(filters), limit)
+    return get_scheduler().get(key, lambda: load_columns(collection, columns, filters, limit=limit), ttl=600)
+
+# The preview shows whatever fields the first documents have
+@st.cache_data(ttl=600)
+def get_preview(n=5):
+    collection = client["Salaries"]["ds_salary_details"]
+    return read_preview(collection, n)
+
+# Aggregations run on the server as $group pipelines, only the results are sent back
 @st.cache_data(ttl=600)
-def get_data():
-    db = client["Salaries"]
-    collection = db["ds_salary_details"]
-    res = collection.find()
-    items = list(res)  # makes it hashable for st.cache_data
-    return items
+def get_aggregate(agg):
+    collection = client["Salaries"]["ds_salary_details"]
+    return mongo_aggregate(collection, agg)
 
-data = get_data()
-df = pd.DataFrame(data)
+df = get_data(("experience_level", "salary_in_usd"))
 
 st.header('Our Data 👀')
-st.dataframe(df.head(5))
+st.dataframe(get_preview())
 st.write("---")
 
 st.header("Data Scientist's Salary Distribution")
-sns_fig = plt.figure(figsize=(20, 10))
-sns.histplot(df["salary_in_usd"],
-             kde=True, bins="auto",
-             alpha=1,fill=True,edgecolor="black")
-st.pyplot(sns_fig)
+# Charts are rendered once per data version and reused across reruns and sessions.
+# Distributions are drawn from binned, FFT-based KDE summaries, not from every row.
+if client_side:
+    st.altair_chart(vega.histogram(density_summary(df, "salary_in_usd"), "salary_in_usd"),
+                    use_container_width=True)
+else:
+    st.image(chart("salary_distribution",
+                   lambda data, ax: draw_histogram(density_summary(data, "salary_in_usd"), ax=ax),
+                   df, figsize=(20, 10)),
+             use_column_width=True)
 
 
 st.subheader('Highest paid Data Science Job Roles 💸')
-data_high = df.copy()
-data_high = pd.DataFrame(data_high.groupby("job_title")["salary_in_usd"].max())
-sns_fig_1 = plt.figure(figsize=(20, 10))
-sns.barplot(x=data_high["salary_in_usd"],
-            y=data_high.index,
-            order=data_high.sort_values("salary_in_usd",ascending=False).index[:11])
-st.pyplot(sns_fig_1)
+data_high = get_aggregate(Aggregation(by="job_title", func="max", value="salary_in_usd"))
+if client_side:
+    st.altair_chart(vega.value_bars(data_high, "salary_in_usd"), use_container_width=True)
+else:
+    st.image(chart("highest_paid_roles",
+                   lambda data, ax: sns.barplot(ax=ax, x=data["salary_in_usd"],
+                                                y=data.index,
+                                                order=data.sort_values("salary_in_usd",ascending=False).index[:11]),
+                   data_high, figsize=(20, 10)),
+             use_column_width=True)
 
 
 st.subheader('Year-wise Avgerage Salary Timeline')
-data_timeline = pd.DataFrame(df.groupby("work_year")["salary_in_usd"].mean())
+data_timeline = get_aggregate(Aggregation(by="work_year", func="mean", value="salary_in_usd"))
 data_timeline = data_timeline.reset_index()
 data_timeline["work_year"].replace({2020:"2020",2021:"2021",2022:"2022"},inplace=True)
-sns_fig_2 = plt.figure(figsize=(20,10))
-sns.lineplot(x=data_timeline["work_year"],
-             y=data_timeline["salary_in_usd"],
-             data=data_timeline)
-st.pyplot(sns_fig_2)
+if client_side:
+    st.altair_chart(vega.line(data_timeline, "work_year", "salary_in_usd"), use_container_width=True)
+else:
+    st.image(chart("salary_timeline",
+                   lambda data, ax: sns.lineplot(ax=ax, x=data["work_year"],
+                                                 y=data["salary_in_usd"],
+                                                 data=data),
+                   data_timeline, figsize=(20, 10)),
+             use_column_width=True)
 st.write("---")
 
 
 st.header("Data Scientist's Experience Level")
-sns_fig_3 = plt.figure(figsize=(20, 10))
-sns.countplot(y=df["experience_level"],
-              order=df["experience_level"].value_counts().index)
-st.pyplot(sns_fig_3)
+experience_counts = get_aggregate(Aggregation(by="experience_level"))["count"]
+if client_side:
+    st.altair_chart(vega.count_bars(experience_counts), use_container_width=True)
+else:
+    st.image(chart("experience_level_counts",
+                   lambda counts, ax: sns.barplot(ax=ax, x=counts.values, y=counts.index, order=counts.index),
+                   experience_counts, figsize=(20, 10)),
+             use_column_width=True)
 
 
 st.subheader("Data Scientist's Salary On Experience Level 💸")
-sns_fig_4 = plt.figure(figsize=(20, 10))
-sns.violinplot(x=df["experience_level"],
-              y=df["salary_in_usd"],
-              order=df["experience_level"].value_counts().index)
-st.pyplot(sns_fig_4)
+if client_side:
+    st.altair_chart(vega.violins(density_summary(df, "salary_in_usd", by="experience_level"),
+                                 experience_counts.index, "salary_in_usd"))
+else:
+    st.image(chart("experience_level_salary",
+                   lambda data, ax: draw_violins(density_summary(data[0], "salary_in_usd", by="experience_level"),
+                                                 order=data[1].index, ax=ax),
+                   (df, experience_counts), figsize=(20, 10)),
+             use_column_width=True)
+
+with st.sidebar.expander("MongoDB latency"):
+    st.json(client.latency.stats())
+
+with st.sidebar.expander("Background refresh"):
+    st.json(get_scheduler().status())
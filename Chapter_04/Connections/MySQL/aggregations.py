@@ -0,0 +1,137 @@
+from dataclasses import dataclass
+from typing import Optional
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class Aggregation:
+    """
+    A count/mean/max/quantile of `value` grouped by the category column `by`.
+    It is compiled to a SQL `GROUP BY` or a MongoDB `$group` stage, so only the
+    aggregated rows are sent over the wire. Frozen, so st.cache_data can hash it.
+    """
+    by: str
+    func: str = "count"  # one of "count", "mean", "max", "quantile"
+    value: Optional[str] = None
+    q: float = 0.5  # only used by "quantile"
+
+    def __post_init__(self):
+        if self.func not in ("count", "mean", "max", "quantile"):
+            raise ValueError(f"Unsupported aggregation: {self.func}")
+        if self.func != "count" and self.value is None:
+            raise ValueError(f"'{self.func}' needs a value column to aggregate.")
+
+    @property
+    def name(self) -> str:
+        return "count" if self.func == "count" else self.value
+
+
+def _finish(result: pd.DataFrame, agg: Aggregation) -> pd.DataFrame:
+    # Normalise the column names (Snowflake upper-cases unquoted aliases)
+    result.columns = [agg.by, agg.name]
+    result = result.set_index(agg.by)
+    if agg.func == "count":
+        result[agg.name] = result[agg.name].astype("int64")
+        return result.sort_values(agg.name, ascending=False)
+    return result.sort_index()
+
+
+#------------------------------------------------
+#----------------------SQL-----------------------
+
+def to_sql(agg: Aggregation, table: str, dialect: str = "mysql") -> Optional[str]:
+    """
+    Compiles the aggregation into a single `GROUP BY` statement, or returns
+    None when the dialect has no equivalent.
+    """
+    if agg.func == "count":
+        expr = "COUNT(*)"
+    elif agg.func == "mean":
+        expr = f"AVG({agg.value})"
+    elif agg.func == "max":
+        expr = f"MAX({agg.value})"
+    elif dialect == "snowflake":
+        expr = f"PERCENTILE_CONT({agg.q}) WITHIN GROUP (ORDER BY {agg.value})"
+    else:
+        # MySQL and SQLite have no ordered-set aggregate for quantiles
+        return None
+
+    return f"SELECT {agg.by}, {expr} AS agg_value FROM {table} GROUP BY {agg.by};"
+
+
+def sql_aggregate(conn, agg: Aggregation, table: str, dialect: str = "mysql", ttl: int = 600) -> pd.DataFrame:
+    """
+    Runs the aggregation on the database through `conn.query`, which works for
+    both st.connection('sql') and st.connection('snowflake'). Falls back to
+    pandas, reading only the two columns involved, when the dialect lacks it.
+    """
+    sql = to_sql(agg, table, dialect)
+    if sql is None:
+        df = conn.query(f"SELECT {agg.by}, {agg.value} FROM {table};", ttl=ttl)
+        df.columns = [agg.by, agg.value]
+        return pandas_aggregate(df, agg)
+
+    return _finish(conn.query(sql, ttl=ttl), agg)
+
+
+#------------------------------------------------
+#----------------------MongoDB-------------------
+
+def to_mongo_pipeline(agg: Aggregation, match: Optional[dict] = None) -> list:
+    """
+    Compiles the aggregation into a `$group` pipeline.
+    """
+    if agg.func == "count":
+        accumulator = {"$sum": 1}
+    elif agg.func == "mean":
+        accumulator = {"$avg": f"${agg.value}"}
+    elif agg.func == "max":
+        accumulator = {"$max": f"${agg.value}"}
+    else:
+        # $percentile needs MongoDB 7.0+ and returns a one-element array
+        accumulator = {"$percentile": {"input": f"${agg.value}", "p": [agg.q], "method": "approximate"}}
+
+    pipeline = [{"$match": match}] if match else []
+    pipeline.append({"$group": {"_id": f"${agg.by}", "agg_value": accumulator}})
+    return pipeline
+
+
+def mongo_aggregate(collection, agg: Aggregation, match: Optional[dict] = None) -> pd.DataFrame:
+    """
+    Runs the aggregation on the MongoDB server. Falls back to pandas, projecting
+    only the two fields involved, if the server rejects the pipeline.
+    """
+    from pymongo.errors import OperationFailure
+
+    try:
+        docs = list(collection.aggregate(to_mongo_pipeline(agg, match)))
+    except OperationFailure:
+        fields = {agg.by: 1, "_id": 0}
+        if agg.value is not None:
+            fields[agg.value] = 1
+        df = pd.DataFrame(list(collection.find(match or {}, fields)))
+        return pandas_aggregate(df, agg)
+
+    values = [doc["agg_value"] for doc in docs]
+    if agg.func == "quantile":
+        values = [value[0] for value in values]
+
+    return _finish(pd.DataFrame({"by": [doc["_id"] for doc in docs], "value": values}), agg)
+
+
+#------------------------------------------------
+#----------------------pandas fallback-----------
+
+def pandas_aggregate(df: pd.DataFrame, agg: Aggregation) -> pd.DataFrame:
+    """
+    Same aggregation, computed in memory on a DataFrame.
+    """
+    grouped = df.groupby(agg.by, observed=True)
+    if agg.func == "count":
+        result = grouped.size()
+    elif agg.func == "quantile":
+        result = grouped[agg.value].quantile(agg.q)
+    else:
+        result = grouped[agg.value].agg(agg.func)
+
+    return _finish(result.reset_index(), agg)
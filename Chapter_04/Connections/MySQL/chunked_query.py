@@ -0,0 +1,51 @@
+import pandas as pd
+from sqlalchemy import text
+
+
+def iter_query_chunks(engine, sql: str, chunksize: int = 10_000):
+    """
+    Streams the result of `sql` in DataFrames of at most `chunksize` rows.
+    `stream_results=True` asks the driver for a server-side cursor, so only
+    one chunk is held in memory at a time instead of the whole table.
+    """
+    with engine.connect() as connection:
+        connection = connection.execution_options(stream_results=True)
+        for chunk in pd.read_sql(text(sql), connection, chunksize=chunksize):
+            yield chunk
+
+
+def read_preview(engine, table: str, n: int = 5) -> pd.DataFrame:
+    """
+    Returns the first `n` rows of `table`. The LIMIT is applied by the server:
+    closing a server-side cursor early would still drain the whole result set.
+    """
+    with engine.connect() as connection:
+        return pd.read_sql(text(f"SELECT * FROM {table} LIMIT {int(n)};"), connection)
+
+
+def chunked_read_columns(engine, sql: str, chunksize: int = 10_000) -> pd.DataFrame:
+    """
+    Reads the query chunk by chunk, shrinking each chunk before it is kept:
+    text columns become categoricals and floats are downcast. Use it with a
+    query that selects only the columns a chart actually needs.
+    """
+    chunks = []
+    for chunk in iter_query_chunks(engine, sql, chunksize):
+        for column in chunk.columns:
+            if chunk[column].dtype == object:
+                chunk[column] = chunk[column].astype("category")
+            elif pd.api.types.is_float_dtype(chunk[column]):
+                chunk[column] = pd.to_numeric(chunk[column], downcast="float")
+        chunks.append(chunk)
+
+    if not chunks:
+        return pd.DataFrame()
+
+    # union_categoricals keeps the category dtype when chunks saw different values
+    df = pd.concat(chunks, ignore_index=True)
+    for column in chunks[0].columns:
+        if isinstance(chunks[0][column].dtype, pd.CategoricalDtype):
+            df[column] = pd.api.types.union_categoricals(
+                [chunk[column] for chunk in chunks]
+            )
+    return df
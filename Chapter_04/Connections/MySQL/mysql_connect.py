@@ -1,45 +1,93 @@
 import streamlit as st
-import matplotlib.pyplot as plt
 import seaborn as sns
+from chunked_query import read_preview, chunked_read_columns
+from aggregations import Aggregation, sql_aggregate
+from pooled_connections import sql_connection, pool_metrics
+from refresh_scheduler import get_scheduler
+from chart_cache import chart
+from density import density_summary, draw_violins
+import vega_charts as vega
 
 st.title(':blue[Streamlit + MySQL Connection]')
 
-# Initialize connection.
-conn = st.connection('mysql', type='sql')
+# In the browser, the charts are drawn from the GROUP BY counts and the density
+# summaries; otherwise they are seaborn images rendered once per data version.
+client_side = st.sidebar.toggle("Render charts in the browser", value=True)
 
-# Perform query.
-df = conn.query('SELECT * FROM ds_salary_details;', ttl=600)
+# Initialize connection, with the pool settings from [pools.mysql] in secrets.
+conn = sql_connection('mysql')
+
+# Perform queries in chunks through a server-side cursor, so the whole table
+# is never held in memory at once. The leading underscore in `_engine` tells
+# st.cache_data not to hash it.
+@st.cache_data(ttl=600)
+def get_preview(_engine, n=5):
+    return read_preview(_engine, 'ds_salary_details', n)
+
+# Counts are computed by the database with GROUP BY, only the totals are sent back
+def get_counts(column):
+    return sql_aggregate(conn, Aggregation(by=column), 'ds_salary_details')["count"]
+
+# The three chart columns are the largest read: the scheduler streams them again
+# in the background, and sessions keep getting the previous copy meanwhile.
+def get_columns(*columns):
+    sql = f'SELECT {", ".join(columns)} FROM ds_salary_details;'
+    return get_scheduler().get(('mysql', sql), lambda: chunked_read_columns(conn.engine, sql), ttl=600)
 
 st.header('Our Data 👀')
-st.dataframe(df.head(5))
+st.dataframe(get_preview(conn.engine))
 st.write("---")
 
 st.header("Data Scientist's Employment Type")
-sns_fig = plt.figure(figsize=(20, 10))
-sns.countplot(y=df["employment_type"],
-              order=df["employment_type"].value_counts().index)
-st.pyplot(sns_fig)
+employment_counts = get_counts("employment_type")
+df = get_columns("employment_type", "company_size", "salary_in_usd")
+# Charts are rendered once per data version and reused across reruns and sessions
+if client_side:
+    st.altair_chart(vega.count_bars(employment_counts), use_container_width=True)
+else:
+    st.image(chart("employment_type_counts",
+                   lambda counts, ax: sns.barplot(ax=ax, x=counts.values, y=counts.index, order=counts.index),
+                   employment_counts, figsize=(20, 10)),
+             use_column_width=True)
 
 
 st.subheader("Data Scientist's Salary On Employment Type")
-sns_fig_1 = plt.figure(figsize=(20, 10))
-sns.violinplot(x=df["employment_type"],
-              y=df["salary_in_usd"],
-              order=df["employment_type"].value_counts().index)
-st.pyplot(sns_fig_1)
+if client_side:
+    st.altair_chart(vega.violins(density_summary(df, "salary_in_usd", by="employment_type"),
+                                 employment_counts.index, "salary_in_usd"))
+else:
+    st.image(chart("employment_type_salary",
+                   lambda data, ax: draw_violins(density_summary(data[0], "salary_in_usd", by="employment_type"),
+                                                 order=data[1].index, ax=ax),
+                   (df, employment_counts), figsize=(20, 10)),
+             use_column_width=True)
 st.write("---")
 
 
 st.header("Company Size 🏢")
-sns_fig_2 = plt.figure(figsize=(20, 10))
-sns.countplot(y=df["company_size"],
-              order=df["company_size"].value_counts().index)
-st.pyplot(sns_fig_2)
+company_size_counts = get_counts("company_size")
+if client_side:
+    st.altair_chart(vega.count_bars(company_size_counts), use_container_width=True)
+else:
+    st.image(chart("company_size_counts",
+                   lambda counts, ax: sns.barplot(ax=ax, x=counts.values, y=counts.index, order=counts.index),
+                   company_size_counts, figsize=(20, 10)),
+             use_column_width=True)
 
 
 st.subheader("Data Scientist's Salary On Company Size")
-sns_fig_3 = plt.figure(figsize=(20, 10))
-sns.violinplot(x=df["company_size"],
-              y=df["salary_in_usd"],
-              order=df["company_size"].value_counts().index)
-st.pyplot(sns_fig_3)
+if client_side:
+    st.altair_chart(vega.violins(density_summary(df, "salary_in_usd", by="company_size"),
+                                 company_size_counts.index, "salary_in_usd"))
+else:
+    st.image(chart("company_size_salary",
+                   lambda data, ax: draw_violins(density_summary(data[0], "salary_in_usd", by="company_size"),
+                                                 order=data[1].index, ax=ax),
+                   (df, company_size_counts), figsize=(20, 10)),
+             use_column_width=True)
+
+with st.sidebar.expander("Connection pool"):
+    st.json(pool_metrics(conn))
+
+with st.sidebar.expander("Background refresh"):
+    st.json(get_scheduler().status())
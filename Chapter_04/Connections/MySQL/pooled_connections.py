@@ -0,0 +1,85 @@
+from collections import Counter
+import streamlit as st
+from sqlalchemy import event
+
+# Used when the `[pools.<name>]` section of secrets.toml leaves a setting out.
+POOL_DEFAULTS = {
+    "size": 5,             # connections kept open
+    "max_overflow": 10,    # extra connections allowed under load
+    "pre_ping": True,      # test each connection before use (drops stale ones)
+    "recycle": 1800,       # seconds before a connection is replaced
+    "timeout": 30,         # seconds to wait for a free connection
+    "query_timeout": 60,   # seconds a single statement may run
+}
+
+
+def pool_settings(name: str) -> dict:
+    """
+    Pool settings for the connection `name`, read from `[pools.<name>]`.
+    """
+    return {**POOL_DEFAULTS, **st.secrets.get("pools", {}).get(name, {})}
+
+
+def sql_connection(name: str):
+    """
+    st.connection(name, type='sql') with a sized, health-checked pool and a
+    per-statement timeout taken from secrets.
+    """
+    settings = pool_settings(name)
+    conn = st.connection(
+        name,
+        type="sql",
+        pool_size=settings["size"],
+        max_overflow=settings["max_overflow"],
+        pool_pre_ping=settings["pre_ping"],
+        pool_recycle=settings["recycle"],
+        pool_timeout=settings["timeout"],
+    )
+    _instrument(conn.engine, settings["query_timeout"])
+    return conn
+
+
+def _instrument(engine, query_timeout: int):
+    # st.connection returns the same engine on every rerun: only hook it once
+    if hasattr(engine, "pool_events"):
+        return
+    engine.pool_events = Counter()
+
+    @event.listens_for(engine, "connect")
+    def set_query_timeout(dbapi_connection, connection_record):
+        if engine.dialect.name == "mysql":
+            with dbapi_connection.cursor() as cursor:
+                cursor.execute(f"SET SESSION MAX_EXECUTION_TIME = {int(query_timeout * 1000)}")
+
+    for name in ("connect", "checkout", "checkin", "invalidate"):
+        event.listen(engine.pool, name, lambda *args, name=name: engine.pool_events.update([name]))
+
+
+def pool_metrics(conn) -> dict:
+    """
+    Current utilization of the connection pool, plus event counts since start
+    (`invalidate` counts the stale connections dropped by pre-ping).
+    """
+    pool = conn.engine.pool
+    metrics = {}
+    for stat in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, stat):
+            metrics[stat] = getattr(pool, stat)()
+    metrics.update(getattr(conn.engine, "pool_events", {}))
+    return metrics
+
+
+def snowflake_connection(name: str = "snowflake"):
+    """
+    st.connection(name) for Snowflake with a statement timeout, reconnecting
+    if the session was closed while idle. The Snowflake connector holds a
+    single session, so only `query_timeout` applies, not the pool sizes.
+    """
+    settings = pool_settings(name)
+    conn = st.connection(
+        name,
+        session_parameters={"STATEMENT_TIMEOUT_IN_SECONDS": settings["query_timeout"]},
+    )
+    if settings["pre_ping"] and conn.raw_connection.is_closed():
+        conn.reset()
+    return conn
@@ -0,0 +1,54 @@
+import hashlib
+import weakref
+from io import BytesIO
+from matplotlib.figure import Figure
+import pandas as pd
+import streamlit as st
+
+# id(data) -> (weak reference, fingerprint), so a dataset is hashed only once
+_fingerprints = {}
+
+
+def data_fingerprint(data) -> str:
+    """
+    A content hash of a DataFrame/Series (or a tuple of them), memoized per
+    object so that reruns on the same data don't hash it again.
+    """
+    items = data if isinstance(data, tuple) else (data,)
+    digest = hashlib.sha1()
+    for item in items:
+        cached = _fingerprints.get(id(item))
+        if cached is None or cached[0]() is not item:
+            row_hashes = pd.util.hash_pandas_object(item, index=True).to_numpy()
+            meta = repr((getattr(item, "columns", None), getattr(item, "name", None), item.shape))
+            fingerprint = hashlib.sha1(row_hashes.tobytes() + meta.encode()).hexdigest()
+            # The entry is dropped when the data is garbage collected
+            ref = weakref.ref(item, lambda _, key=id(item): _fingerprints.pop(key, None))
+            _fingerprints[id(item)] = cached = (ref, fingerprint)
+        digest.update(cached[1].encode())
+    return digest.hexdigest()
+
+
+# The draw function and the data are not hashed (leading underscore): the
+# fingerprint and the chart spec are the cache key, shared by all sessions.
+@st.cache_data(max_entries=256)
+def _render(fingerprint: str, spec: tuple, _draw, _data) -> bytes:
+    options = dict(spec)
+    # A standalone Figure, not pyplot's current one: pyplot state is shared by
+    # every thread, so concurrent sessions could draw into each other's chart
+    fig = Figure(figsize=options["figsize"])
+    _draw(_data, fig.subplots())
+    with BytesIO() as buffer:
+        fig.savefig(buffer, format=options["fmt"], dpi=options["dpi"], bbox_inches="tight")
+        return buffer.getvalue()
+
+
+def chart(name: str, draw, data, figsize=(20, 10), fmt: str = "png", dpi: int = 72):
+    """
+    Returns the rendered bytes of `draw(data, ax)` on the axes of a new figure.
+    The image is rendered once per chart `name`, figure options and data
+    content, and then reused across reruns and sessions. Show it with `st.image`.
+    """
+    spec = (("name", name), ("figsize", tuple(figsize)), ("fmt", fmt), ("dpi", dpi))
+    rendered = _render(data_fingerprint(data), spec, draw, data)
+    return rendered.decode() if fmt == "svg" else rendered
@@ -1,30 +1,63 @@
 import streamlit as st
 import pandas
-import matplotlib.pyplot as plt
 import seaborn as sns
+from aggregations import Aggregation, sql_aggregate
+from pooled_connections import snowflake_connection
+from refresh_scheduler import get_scheduler
+from chart_cache import chart
+from density import density_summary, draw_violins
+import vega_charts as vega
 
 st.title(':blue[Streamlit + Snowflake Connection❄]')
 
-# Initialize connection.
-conn = st.connection('snowflake')
+# Altair lets the browser draw the remote-ratio charts; turn it off for the
+# server-rendered seaborn images.
+client_side = st.sidebar.toggle("Render charts in the browser", value=True)
 
-# Perform query.
-df = conn.query('SELECT * from DS_SALARY_DETAILS;', ttl=600)
+# Initialize connection, with the timeout settings from [pools.snowflake] in secrets.
+conn = snowflake_connection('snowflake')
+
+# Perform queries. Only the rows and columns each section needs are fetched.
+preview = conn.query('SELECT * from DS_SALARY_DETAILS LIMIT 5;', ttl=600)
+# The remote ratio/salary pairs are fetched as Arrow batches by a scheduler
+# thread ahead of expiry, so reruns don't wait on the warehouse.
+def fetch_salaries():
+    with conn.cursor() as cursor:
+        cursor.execute('SELECT REMOTE_RATIO, SALARY_IN_USD from DS_SALARY_DETAILS;')
+        return cursor.fetch_pandas_all()
+
+df = get_scheduler().get(('snowflake', 'salaries'), fetch_salaries, ttl=600)
+
+# Counts are computed by Snowflake with GROUP BY, only the totals are sent back
+remote_counts = sql_aggregate(conn, Aggregation(by="REMOTE_RATIO"),
+                              'DS_SALARY_DETAILS', dialect="snowflake")["count"]
 
 st.header('Our Data 👀')
-st.dataframe(df.head(5))
+st.dataframe(preview)
 st.write("---")
 
 st.header("Data Scientist's Remote Job Types")
-sns_fig = plt.figure(figsize=(35, 15))
-sns.countplot(y=df["REMOTE_RATIO"],
-              order=df["REMOTE_RATIO"].value_counts().index)
-st.pyplot(sns_fig)
+# Charts are rendered once per data version and reused across reruns and sessions
+if client_side:
+    st.altair_chart(vega.count_bars(remote_counts), use_container_width=True)
+else:
+    st.image(chart("remote_ratio_counts",
+                   lambda counts, ax: sns.barplot(ax=ax, x=counts.values, y=counts.index,
+                                                  order=counts.index, orient="h"),
+                   remote_counts, figsize=(35, 15)),
+             use_column_width=True)
 
 
 st.subheader("Data Scientist's Salary On Remote Job Types")
-sns_fig_1 = plt.figure(figsize=(35, 15))
-sns.violinplot(x=df["REMOTE_RATIO"],
-              y=df["SALARY_IN_USD"],
-              order=df["REMOTE_RATIO"].value_counts().index)
-st.pyplot(sns_fig_1)
+if client_side:
+    st.altair_chart(vega.violins(density_summary(df, "SALARY_IN_USD", by="REMOTE_RATIO"),
+                                 remote_counts.index, "SALARY_IN_USD"))
+else:
+    st.image(chart("remote_ratio_salary",
+                   lambda data, ax: draw_violins(density_summary(data[0], "SALARY_IN_USD", by="REMOTE_RATIO"),
+                                                 order=data[1].index, ax=ax),
+                   (df, remote_counts), figsize=(35, 15)),
+             use_column_width=True)
+
+with st.sidebar.expander("Background refresh"):
+    st.json(get_scheduler().status())
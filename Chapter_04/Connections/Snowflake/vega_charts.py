@@ -0,0 +1,83 @@
+import altair as alt
+import numpy as np
+import pandas as pd
+from density import DensitySummary
+
+# Charts built here carry only pre-aggregated rows (counts, density curves),
+# and the browser renders the Vega-Lite spec, so the server does no drawing.
+
+
+def count_bars(counts: pd.Series, label: str = "count") -> alt.Chart:
+    """
+    Horizontal bars of precomputed category counts, like `sns.countplot(y=...)`.
+    """
+    data = pd.DataFrame({"category": counts.index.astype(str), label: counts.to_numpy()})
+    return alt.Chart(data).mark_bar().encode(
+        x=alt.X(f"{label}:Q", title=label),
+        y=alt.Y("category:N", sort=list(data["category"]), title=counts.index.name),
+        color=alt.Color("category:N", legend=None, sort=list(data["category"])),
+        tooltip=["category", label],
+    )
+
+
+def value_bars(df: pd.DataFrame, value: str, top: int = 11) -> alt.Chart:
+    """
+    Horizontal bars of one value per category (the index), largest first.
+    """
+    data = df[value].sort_values(ascending=False)[:top]
+    data = pd.DataFrame({"category": data.index.astype(str), value: data.to_numpy()})
+    return alt.Chart(data).mark_bar().encode(
+        x=alt.X(f"{value}:Q"),
+        y=alt.Y("category:N", sort=list(data["category"]), title=df.index.name),
+        color=alt.Color("category:N", legend=None, sort=list(data["category"])),
+        tooltip=["category", value],
+    )
+
+
+def violins(summary: DensitySummary, order, value: str, points: int = 128) -> alt.Chart:
+    """
+    Violins drawn from a density summary, one column per category in `order`.
+    The density curves are resampled to `points` values over the range of
+    each category.
+    """
+    positions = summary.positions(order)
+    order = list(positions)
+    frames = []
+    for category, i in positions.items():
+        grid = np.linspace(*summary.bounds[i], points)
+        frames.append(pd.DataFrame({
+            "category": str(category),
+            value: grid,
+            "density": np.interp(grid, summary.grid, summary.density[i]),
+        }))
+    return alt.Chart(pd.concat(frames, ignore_index=True)).mark_area(orient="horizontal").encode(
+        y=alt.Y(f"{value}:Q"),
+        x=alt.X("density:Q", stack="center", impute=None, title=None,
+                axis=alt.Axis(labels=False, values=[0], grid=False, ticks=True)),
+        color=alt.Color("category:N", legend=None),
+        column=alt.Column("category:N", sort=[str(category) for category in order],
+                          header=alt.Header(titleOrient="bottom", labelOrient="bottom")),
+    ).properties(width=120).configure_facet(spacing=0).configure_view(stroke=None)
+
+
+def histogram(summary: DensitySummary, value: str, bins: int = 64) -> alt.Chart:
+    """
+    A histogram with its KDE line, like `sns.histplot(kde=True)`, from a
+    summary computed without categories.
+    """
+    grid, hist = summary.grid, summary.hist[0]
+    edges = np.linspace(grid[0], grid[-1], bins + 1)
+    bin_counts, _ = np.histogram(grid, bins=edges, weights=hist)
+    bars = pd.DataFrame({"start": edges[:-1], "end": edges[1:], "count": bin_counts})
+    curve = pd.DataFrame({value: grid,
+                          "count": summary.density[0] * summary.counts[0] * (edges[1] - edges[0])})
+
+    return alt.layer(
+        alt.Chart(bars).mark_bar(stroke="black").encode(
+            x=alt.X("start:Q", title=value), x2="end:Q", y="count:Q"),
+        alt.Chart(curve).mark_line(strokeWidth=2).encode(x=f"{value}:Q", y="count:Q"),
+    )
+
+
+def line(df: pd.DataFrame, x: str, y: str) -> alt.Chart:
+    return alt.Chart(df).mark_line(point=True).encode(x=alt.X(f"{x}:O"), y=alt.Y(f"{y}:Q"))
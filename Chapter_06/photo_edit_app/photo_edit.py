@@ -1,6 +1,7 @@
 import streamlit as st
 from pathlib import Path
-from PIL import Image, ImageOps, ImageEnhance
+from PIL import Image, ImageOps
+from fused_edits import adjust
 
 
 @st.cache_resource
@@ -58,12 +59,10 @@ def main():
 
         with rcol:
             contrast_factor = st.slider("Contrast", 0.2, 2.0, 1.0, 0.1)
-            contrast = ImageEnhance.Contrast(img)
-            img = contrast.enhance(contrast_factor)
-
             brightness_factor = st.slider("Brightness", 0.0, 2.0, 1.0, 0.1)
-            brightness = ImageEnhance.Brightness(img)
-            img = brightness.enhance(brightness_factor)
+
+            ## Contrast and brightness are applied together, in a single pass
+            img = adjust(img, contrast=contrast_factor, brightness=brightness_factor)
 
     ## Show processed photo
     with photo_col:
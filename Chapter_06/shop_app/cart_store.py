@@ -0,0 +1,104 @@
+import atexit
+import sqlite3
+import streamlit as st
+from threading import Event, Lock, Thread
+
+
+class CartStore:
+    """Carts saved in SQLite with write-behind: changes are only recorded in
+    memory (coalescing repeated clicks on the same line) and a background
+    thread writes them in one transaction every `flush_interval` seconds"""
+
+    def __init__(self, path="carts.db", flush_interval=1.0):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # WAL keeps the file consistent if the process dies mid-write
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cart_lines ("
+            "cart_id TEXT, sku INTEGER, qty INTEGER, PRIMARY KEY (cart_id, sku))"
+        )
+        self._db.commit()
+
+        self._lock = Lock()
+        self._db_lock = Lock()
+        self._pending = {}  # (cart_id, sku) -> latest qty, 0 to delete
+        self._flushing = {}  # Changes being written right now
+        self._stop = Event()
+        self._flush_interval = flush_interval
+
+        Thread(target=self._run, daemon=True, name="cart-store").start()
+        atexit.register(self.close)
+
+    def save(self, cart_id, sku, qty):
+        """Record the new quantity of a cart line, without touching the disk"""
+        with self._lock:
+            self._pending[(cart_id, sku)] = qty
+
+    def load(self, cart_id):
+        """The cart's lines as {sku: qty}, including changes not flushed yet"""
+        # Snapshot the unflushed changes first: if a flush commits them while
+        # the table is read, the rows read already hold the same values
+        with self._lock:
+            unflushed = {
+                sku: qty
+                for changes in (self._flushing, self._pending)
+                for (pending_cart, sku), qty in changes.items()
+                if pending_cart == cart_id
+            }
+
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT sku, qty FROM cart_lines WHERE cart_id = ?", (cart_id,)
+            ).fetchall()
+
+        lines = {**dict(rows), **unflushed}
+        return {sku: qty for sku, qty in lines.items() if qty > 0}
+
+    def flush(self):
+        """Write all pending changes in a single transaction"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushing = pending
+
+        if not pending:
+            return
+
+        upserts = [(cart, sku, qty) for (cart, sku), qty in pending.items() if qty > 0]
+        deletes = [(cart, sku) for (cart, sku), qty in pending.items() if qty <= 0]
+
+        try:
+            with self._db_lock, self._db:
+                self._db.executemany(
+                    "INSERT INTO cart_lines VALUES (?, ?, ?) "
+                    "ON CONFLICT (cart_id, sku) DO UPDATE SET qty = excluded.qty",
+                    upserts,
+                )
+                self._db.executemany(
+                    "DELETE FROM cart_lines WHERE cart_id = ? AND sku = ?", deletes
+                )
+
+        except sqlite3.Error:
+            # The transaction was rolled back: keep the changes for the next flush,
+            # unless the same lines were changed again in the meantime
+            with self._lock:
+                for key, qty in pending.items():
+                    self._pending.setdefault(key, qty)
+
+        finally:
+            with self._lock:
+                self._flushing = {}
+
+    def _run(self):
+        while not self._stop.wait(self._flush_interval):
+            self.flush()
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+
+@st.cache_resource
+def get_cart_store():
+    """SQLite allows one writer at a time, so all sessions of the process
+    funnel their changes through a single store and its flush thread"""
+    return CartStore()
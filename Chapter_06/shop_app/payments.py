@@ -0,0 +1,96 @@
+import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from threading import Event, Lock, Thread
+from time import monotonic, sleep
+
+
+@dataclass
+class Order:
+    key: str
+    amount: float
+    lines: dict = field(default_factory=dict)  # SKU -> quantity paid for
+    label: str = "💵 Initiating payment..."
+    state: str = "running"  # "running", "complete" or "error"
+    finished_at: float = 0.0
+
+
+class FakeGateway:
+    """Stand-in for a payment provider: takes a few seconds per charge"""
+
+    def charge(self, order):
+        sleep(1)
+        order.label = "💰 Grabbing your wallet..."
+
+        sleep(2)
+        order.label = "💸 Paying..."
+
+        sleep(1)
+
+
+class PaymentQueue:
+    """Runs payments on a worker pool so the script threads never wait on
+    the gateway. Orders are keyed by an idempotency key: submitting the same
+    key again returns the existing order instead of charging twice.
+    A background thread drops finished orders `keep_for` seconds after they
+    end, in case the session that polls them was closed"""
+
+    def __init__(self, gateway, workers=8, keep_for=600):
+        self._gateway = gateway
+        self._keep_for = keep_for
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="payments")
+        self._lock = Lock()
+        self._orders = {}
+        self._stop = Event()
+
+        Thread(target=self._run_expiry, daemon=True, name="payments-expiry").start()
+
+    def submit(self, key, amount, lines=None):
+        with self._lock:
+            if key in self._orders:
+                return self._orders[key]
+
+            order = self._orders[key] = Order(key, amount, dict(lines or {}))
+
+        self._executor.submit(self._process, order)
+        return order
+
+    def _process(self, order):
+        try:
+            self._gateway.charge(order)
+            order.label, order.state = "✅ Payment complete!", "complete"
+
+        except Exception as e:
+            order.label, order.state = f"❌ Payment failed: {e}", "error"
+
+        order.finished_at = monotonic()
+
+    def _expire(self):
+        now = monotonic()
+
+        with self._lock:
+            expired = [
+                key for key, order in self._orders.items()
+                if order.finished_at and now - order.finished_at > self._keep_for
+            ]
+
+            for key in expired:
+                del self._orders[key]
+
+    def _run_expiry(self):
+        while not self._stop.wait(min(self._keep_for, 60)):
+            self._expire()
+
+    def get(self, key):
+        return self._orders.get(key)
+
+    def forget(self, key):
+        with self._lock:
+            self._orders.pop(key, None)
+
+
+@st.cache_resource
+def get_payment_queue():
+    """The orders must outlive a session's reruns and reconnects, so the
+    queue is kept per process rather than in session state"""
+    return PaymentQueue(FakeGateway())
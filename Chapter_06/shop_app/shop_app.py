@@ -1,6 +1,72 @@
 import streamlit as st
 from itertools import cycle
-from store_utils import create_items_db, ShoppingCart
+from math import ceil
+from store_utils import get_catalog, ShoppingCart, render_payment_status, render_payment_error
+from cart_store import get_cart_store
+from uuid import uuid4
+
+PAGE_SIZES = [10, 20, 50]
+ALL_CATEGORIES = "All categories"
+PERSIST_CARTS = True  # Keep carts in carts.db across reconnects and restarts
+
+
+def create_cart():
+    """A new cart for the session. With PERSIST_CARTS, the cart id is kept in
+    the URL so that reconnecting restores the saved cart.
+
+    The id is a random 128-bit token and the only thing guarding the cart:
+    anyone with the URL (e.g. a shared link) can read and change that cart.
+    Don't store anything more sensitive than cart lines under it"""
+    if not PERSIST_CARTS:
+        return ShoppingCart()
+
+    if "cart" not in st.query_params:
+        st.query_params["cart"] = uuid4().hex
+
+    cart_id = st.query_params["cart"]
+    store = get_cart_store()
+    cart = ShoppingCart()
+    catalog = get_catalog()
+
+    for sku, qty in store.load(cart_id).items():
+        if sku in catalog:
+            cart[sku] = qty
+
+    ## Save changes from now on (written to disk in the background)
+    cart.on_change = lambda sku, qty: store.save(cart_id, sku, qty)
+    return cart
+
+
+def reset_page():
+    st.session_state.page = 1
+
+
+def change_page(step):
+    st.session_state.page += step
+
+
+@st.fragment
+def render_cart():
+    """Shopping cart badge, with the products in the cart. Product cards only
+    rerun the whole app when a click adds or removes a line, so the badge
+    only shows what that keeps current: the number of lines and their names.
+    Quantities and the total are shown by the checkout dialog, which reads
+    the cart when it opens"""
+    with st.popover(
+        f"🛒 {len(st.session_state.cart) or ''}",
+        help=":gray[*Shopping cart*]",
+        use_container_width=True,
+    ):
+        st.write("🛒 _Shopping Cart_")
+        st.session_state.cart.render_short_summary()
+
+        if st.button(
+            "Go to checkout",
+            use_container_width=True,
+            help="See quantities and your total",
+            disabled=not st.session_state.cart,
+        ):
+            st.session_state.cart.show()
 
 
 def main():
@@ -9,11 +75,12 @@ def main():
     )
 
     if "cart" not in st.session_state:
-        st.session_state.cart = ShoppingCart()
+        st.session_state.cart = create_cart()
 
-    if "items_db" not in st.session_state:
-        st.session_state.items_db = {}
-        create_items_db()
+    if "page" not in st.session_state:
+        reset_page()
+
+    catalog = get_catalog()
 
     ## Page layout
     st.header(":rainbow[The Little Store] ***:gray[Online]***", divider="grey")
@@ -26,36 +93,91 @@ def main():
     with slogan_column:
         st.write("Welcome to the little store.")
 
+        ## Only sessions with a pending order poll the payment queue
+        if "order_key" in st.session_state:
+            render_payment_status()
+
+        if "payment_error" in st.session_state:
+            render_payment_error()
+
     with store_information_area:
         st.caption("🔪 This is a recipe from the Streamlit Cookbook")
 
     ## Shopping cart interface
     with cart_column:
-        with st.popover(
-            "🛒",
-            help=":gray[*Shopping cart*]",
-            use_container_width=True,
-        ):
-            st.write("🛒 _Shopping Cart_")
-            st.session_state.cart.render_short_summary()
-
-            if st.button(
-                "Go to checkout",
-                use_container_width=True,
-                help=f"Your total is *:green[${st.session_state.cart.total:.2f}]*",
-                disabled=not st.session_state.cart,
-            ):
-                st.session_state.cart.show()
+        render_cart()
 
     ## Item description area
     with items_area:
-        ## Create columns in the main section
+        ## Search and filter over the catalog index
+        search_column, category_column, page_size_column = st.columns([4, 2, 1])
+
+        with search_column:
+            query = st.text_input(
+                "Search",
+                placeholder="🔎 Search products",
+                label_visibility="collapsed",
+                on_change=reset_page,
+            )
+
+        with category_column:
+            category = st.selectbox(
+                "Category",
+                [ALL_CATEGORIES, *catalog.categories],
+                label_visibility="collapsed",
+                on_change=reset_page,
+            )
+
+        with page_size_column:
+            page_size = st.selectbox(
+                "Items per page",
+                PAGE_SIZES,
+                label_visibility="collapsed",
+                on_change=reset_page,
+            )
+
+        items = catalog.search(query, None if category == ALL_CATEGORIES else category)
+        n_pages = max(1, ceil(len(items) / page_size))
+        st.session_state.page = min(max(st.session_state.page, 1), n_pages)
+        first = (st.session_state.page - 1) * page_size
+
+        if not items:
+            st.info("No products match your search.")
+
+        ## Create columns in the main section, rendering only the current page
         items_cols = cycle(st.columns(2))
 
-        for col, item in zip(items_cols, st.session_state.items_db.values()):
+        for col, item in zip(items_cols, items[first : first + page_size]):
             with col:
                 item.render()
 
+        ## Page navigation
+        if n_pages > 1:
+            previous_column, page_column, next_column = st.columns(
+                [1, 5, 1], vertical_alignment="center"
+            )
+
+            with previous_column:
+                st.button(
+                    "◀",
+                    on_click=change_page,
+                    args=(-1,),
+                    disabled=st.session_state.page == 1,
+                    use_container_width=True,
+                )
+
+            with page_column:
+                st.caption(f"Page {st.session_state.page} of {n_pages}")
+
+            with next_column:
+                st.button(
+                    "▶",
+                    on_click=change_page,
+                    args=(1,),
+                    disabled=st.session_state.page == n_pages,
+                    use_container_width=True,
+                )
+
 
 if __name__ == "__main__": 
     main()
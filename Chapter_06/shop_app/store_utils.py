@@ -1,28 +1,39 @@
 import streamlit as st
 from dataclasses import dataclass
-from collections import UserDict
-from time import sleep
+from collections.abc import Mapping, MutableMapping
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from types import MappingProxyType
+from uuid import uuid4
 import json
+from thumbnails import get_thumbnail_store
+from payments import get_payment_queue
 
 
-@dataclass
+@dataclass(frozen=True)
 class Item:
     sku: str
     name: str
     price: float
     description: str
     image: str
+    category: str = "Other"
 
-    def __post_init__(self):
-        # Adds the product to the database dictionary
-        st.session_state.items_db[self.sku] = self
-
+    @st.fragment
     def render(self):
+        """Product card. As a fragment, its buttons only rerun this card.
+        A click that adds or removes a cart line also changes the badge, so
+        it reruns the app: callbacks can't, so the card does it first thing,
+        at the cost of an (empty) extra fragment run for those clicks only"""
+        if st.session_state.pop("cart_lines_changed", False):
+            st.rerun()
+
         with st.container(border=True):
             left_col, right_col = st.columns([1, 2], vertical_alignment="center")
 
             with left_col:
-                st.image(self.image, use_column_width=True)
+                st.image(get_thumbnail_store().get(self.image, "card"), use_column_width=True)
 
             with right_col:
                 st.markdown(f":blue-background[:violet[**{self.name}**]]")
@@ -57,6 +68,7 @@ class Item:
 
         else:
             st.session_state.cart[self.sku] = 1
+            st.session_state.cart_lines_changed = True
 
         st.toast(
             f"{self.name} was added to the cart.", icon=":material/add_shopping_cart:"
@@ -74,10 +86,9 @@ class Item:
 
     def remove_from_cart_callback(self):
         if self.sku in st.session_state.cart:
+            # The cart drops the line once its quantity reaches zero
             st.session_state.cart[self.sku] -= 1
-
-            if st.session_state.cart[self.sku] <= 0:
-                del st.session_state.cart[self.sku]
+            st.session_state.cart_lines_changed = self.sku not in st.session_state.cart
 
             st.toast(
                 f"{self.name} was removed from the cart.",
@@ -85,41 +96,168 @@ class Item:
             )
 
 
-class ShoppingCart(UserDict):
+class Catalog(Mapping):
+    """Read-only mapping of SKU to Item, with word and category indexes
+    built when the items file is loaded. Nothing in it is ever mutated, so
+    sessions read it concurrently without copies or locks"""
+
+    def __init__(self, items):
+        self._items = MappingProxyType({item.sku: item for item in items})
+        self._positions = {sku: i for i, sku in enumerate(self._items)}
+        self._by_category = {}
+        self._by_word = {}
+
+        for item in self._items.values():
+            self._by_category.setdefault(item.category, []).append(item.sku)
+
+            for word in f"{item.name} {item.description}".lower().split():
+                self._by_word.setdefault(word.strip(".,"), set()).add(item.sku)
+
+        # Sorted vocabulary: the words starting with a prefix are contiguous
+        self._words = sorted(self._by_word)
+
     @property
-    def summary(self):
-        db = st.session_state.items_db
-        skus = self.keys()
+    def categories(self):
+        return sorted(self._by_category)
+
+    def search(self, query="", category=None):
+        """Items matching every word of `query` (as word prefixes) and the
+        category, in catalog order"""
+        skus = set(self._by_category.get(category, ())) if category else set(self._items)
+
+        for term in query.lower().split():
+            skus &= set().union(*(self._by_word[word] for word in self._words_starting(term)))
+
+        return [self._items[sku] for sku in sorted(skus, key=self._positions.get)]
+
+    def _words_starting(self, prefix):
+        for i in range(bisect_left(self._words, prefix), len(self._words)):
+            if not self._words[i].startswith(prefix):
+                break
+
+            yield self._words[i]
+
+    def __getitem__(self, sku):
+        return self._items[sku]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+
+@st.cache_resource(max_entries=1)
+def load_catalog(path: str, mtime: float):
+    """Build the catalog once per process and version of the items file"""
+    with open(path, "r") as f:
+        catalog = Catalog(Item(**item) for item in json.load(f))
+
+    # Start generating the thumbnails in the background right away
+    get_thumbnail_store().prefetch(item.image for item in catalog.values())
+    return catalog
+
+
+def get_catalog(path="items.json"):
+    """The shared catalog, reloaded when the items file is modified"""
+    return load_catalog(path, Path(path).stat().st_mtime)
+
+
+class ShoppingCart(MutableMapping):
+    """Mapping of SKU to quantity that keeps its summary columns and total
+    up to date on every change, instead of rebuilding them on each read"""
+
+    __slots__ = ("_index", "_skus", "_names", "_images", "_prices", "_cents", "_qtys", "_total_cents", "on_change")
+
+    def __init__(self, on_change=None):
+        # Optional callback(sku, qty) on every change, e.g. to persist the cart
+        self.on_change = on_change
+        self._index = {}  # SKU -> position in the columns below
+        self._skus = []
+        self._names = []
+        self._images = []
+        self._prices = array("d")
+        self._cents = array("q")  # Integer prices keep the running total exact
+        self._qtys = array("q")
+        self._total_cents = 0
+
+    def __getitem__(self, sku):
+        return self._qtys[self._index[sku]]
+
+    def __setitem__(self, sku, qty):
+        if qty <= 0:
+            del self[sku]
+            return
+
+        position = self._index.get(sku)
+
+        # Look the item up first: an unknown SKU raises before being saved
+        item = get_catalog()[sku] if position is None else None
 
+        if self.on_change:
+            self.on_change(sku, qty)
+
+        if position is None:
+            self._index[sku] = len(self._skus)
+            self._skus.append(sku)
+            self._names.append(item.name)
+            self._images.append(item.image)
+            self._prices.append(item.price)
+            self._cents.append(round(item.price * 100))
+            self._qtys.append(qty)
+            self._total_cents += self._cents[-1] * qty
+
+        else:
+            self._total_cents += self._cents[position] * (qty - self._qtys[position])
+            self._qtys[position] = qty
+
+    def __delitem__(self, sku):
+        position = self._index.pop(sku)
+
+        if self.on_change:
+            self.on_change(sku, 0)
+
+        self._total_cents -= self._cents[position] * self._qtys[position]
+
+        for column in (self._skus, self._names, self._images, self._prices, self._cents, self._qtys):
+            del column[position]
+
+        for moved_sku in self._skus[position:]:
+            self._index[moved_sku] -= 1
+
+    def __iter__(self):
+        return iter(self._skus)
+
+    def __len__(self):
+        return len(self._skus)
+
+    @property
+    def summary(self):
         return {
-            "sku": skus,
-            "name": [db[sku].name for sku in skus],
-            "image": [db[sku].image for sku in skus],
-            "price": [db[sku].price for sku in skus],
-            "qty": list(self.values()),
+            "sku": self._skus,
+            "name": self._names,
+            "image": self._images,
+            "price": self._prices,
+            "qty": self._qtys,
         }
 
     @property
     def total(self):
-        db = st.session_state.items_db
-        qtys = self.values()
-        prices = (db[sku].price for sku in self.keys())
-
-        return sum([q * p for q, p in zip(qtys, prices)])
+        return self._total_cents / 100
 
     def render_short_summary(self):
-        names = self.summary["name"]
-        qtys = self.summary["qty"]
-
-        for name, qty in zip(names, qtys):
-            st.markdown(f":gray[- {name} (× {qty:.0f})]")
+        for name in self._names:
+            st.markdown(f":gray[- {name}]")
 
     @st.experimental_dialog("🛒 Shopping cart", width="large")
     def show(self):
         """Dialog to show the shopping cart and options to pay"""
 
+        thumbnails = get_thumbnail_store()
+        summary = dict(self.summary, image=[thumbnails.data_uri(image) for image in self._images])
+
         st.dataframe(
-            self.summary,
+            summary,
             use_container_width=True,
             hide_index=True,
             column_config={
@@ -141,38 +279,83 @@ class ShoppingCart(UserDict):
                 disabled=not self,
                 use_container_width=True,
             ):
-                del st.session_state.cart
+                st.session_state.cart.clear()
                 st.rerun()
 
         with pay_column:
 
             pay_button = st.button(
                 f"Pay total: ${self.total:.2f}",
-                disabled=not self,
+                disabled=not self or "order_key" in st.session_state,
                 type="primary",
                 use_container_width=True,
             )
 
         if pay_button:
             self.run_payment()
-            del st.session_state.cart
             st.rerun()
 
     def run_payment(self):
-        with st.status("💵 Initiating payment...", expanded=False) as status:
-            sleep(1)
-            status.update(label="💰 Grabbing your wallet...")
+        """Hand the payment to the background queue and return immediately.
+        The order key makes a repeated submission charge only once"""
+        if "order_key" not in st.session_state:
+            st.session_state.order_key = uuid4().hex
+
+        get_payment_queue().submit(st.session_state.order_key, self.total, dict(self))
+
+    def remove_paid(self, lines):
+        """Remove the quantities of a paid order, keeping anything added to
+        the cart while the payment was running"""
+        for sku, qty in lines.items():
+            if sku in self:
+                # The cart drops the line once its quantity reaches zero
+                self[sku] -= qty
+
+
+@st.fragment(run_every="1s")
+def render_payment_status():
+    """Polls the payment of this session's order. Once the order is over, it
+    reruns the app, which stops rendering (and polling) this fragment"""
+    key = st.session_state.get("order_key")
+
+    if key is None:
+        st.rerun()
+
+    queue = get_payment_queue()
+    order = queue.get(key)
 
-            sleep(2)
-            status.update(label="💸 Paying...")
+    if order is None:
+        # The queue was restarted: nothing is pending for this key anymore
+        del st.session_state.order_key
+        st.rerun()
 
-            sleep(1)
-            status.update(label="✅ Payment complete!", state="complete")
-            sleep(1)
+    if order.state == "complete":
+        queue.forget(key)
+        del st.session_state.order_key
+        st.session_state.cart.remove_paid(order.lines)
+        st.toast("✅ Payment complete!")
+        st.rerun()
 
+    if order.state == "error":
+        # Shown until dismissed; the user can try again with a new order
+        queue.forget(key)
+        del st.session_state.order_key
+        st.session_state.payment_error = order.label
+        st.rerun()
 
-def create_items_db():
-    with open("items.json", "r") as f:
-        all_items = json.load(f)
-        for item in all_items:
-            Item(**item)
+    st.status(order.label, state=order.state, expanded=False)
+
+
+def render_payment_error():
+    """The last failed payment, until the user dismisses it"""
+    error_column, dismiss_column = st.columns([4, 1], vertical_alignment="center")
+
+    with error_column:
+        st.error(st.session_state.payment_error)
+
+    with dismiss_column:
+        st.button(
+            "Dismiss",
+            on_click=lambda: st.session_state.pop("payment_error", None),
+            use_container_width=True,
+        )
@@ -0,0 +1,119 @@
+import os
+import streamlit as st
+import tempfile
+from base64 import b64encode
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from io import BytesIO
+from pathlib import Path
+from threading import Lock
+from urllib.request import urlopen
+from PIL import Image, UnidentifiedImageError
+
+## Bounding boxes of the thumbnails served to each view
+SIZES = {
+    "card": (400, 400),
+    "cart": (96, 96),
+}
+
+
+class ThumbnailStore:
+    """Resized WebP copies of the product images, generated once per image in
+    a background worker pool and stored on disk under their content hash"""
+
+    def __init__(self, root="thumbnails", workers=4):
+        self.root = Path(root)
+        self.root.mkdir(exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnails")
+        self._lock = Lock()
+        self._ready = {}  # (source, view) -> thumbnail path
+        self._pending = set()
+        self._failed = set()
+
+    def _read_source(self, source):
+        if source.startswith(("http://", "https://")):
+            with urlopen(source, timeout=10) as response:
+                return response.read()
+        return Path(source).read_bytes()
+
+    def _write(self, data, size, path):
+        """Saves the thumbnail to a temporary file next to `path`, then moves
+        it into place, so a crash or a concurrent writer never leaves a
+        truncated file at `path`"""
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+
+        try:
+            with os.fdopen(fd, "wb") as f, Image.open(BytesIO(data)) as img:
+                img.thumbnail(size)
+                img.save(f, format="WEBP", quality=80)
+
+            os.replace(tmp, path)
+
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _generate(self, source):
+        try:
+            data = self._read_source(source)
+            digest = sha256(data).hexdigest()
+
+            for view, size in SIZES.items():
+                path = self.root / digest[:2] / f"{digest}-{size[0]}x{size[1]}.webp"
+
+                if not path.exists():
+                    path.parent.mkdir(exist_ok=True)
+                    self._write(data, size, path)
+
+                with self._lock:
+                    self._ready[(source, view)] = path
+
+        except UnidentifiedImageError:
+            # Images Pillow can't read (e.g. SVG) keep being served as they are
+            with self._lock:
+                self._failed.add(source)
+
+        except Exception:
+            # e.g. a network timeout: the next request for the image retries
+            pass
+
+        finally:
+            with self._lock:
+                self._pending.discard(source)
+
+    def prefetch(self, sources):
+        """Queue the thumbnails of `sources` for generation"""
+        with self._lock:
+            queued = set(sources) - self._pending - self._failed
+            queued -= {source for source, _ in self._ready}
+            self._pending |= queued
+
+        for source in queued:
+            self._executor.submit(self._generate, source)
+
+    def get(self, source, view="card"):
+        """Path of the thumbnail, or the original image until it's ready"""
+        path = self._ready.get((source, view))
+
+        if path is None:
+            self.prefetch([source])
+            return source
+
+        return str(path)
+
+    def data_uri(self, source, view="cart"):
+        """The thumbnail as a data URI, for st.column_config.ImageColumn"""
+        path = self._ready.get((source, view))
+
+        if path is None:
+            self.prefetch([source])
+            return source
+
+        return f"data:image/webp;base64,{b64encode(path.read_bytes()).decode()}"
+
+
+@st.cache_resource
+def get_thumbnail_store():
+    """Thumbnails live on disk, so one store per process is enough: sessions
+    only ever read the paths it hands out"""
+    return ThumbnailStore()
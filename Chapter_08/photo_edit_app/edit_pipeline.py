@@ -0,0 +1,64 @@
+from hashlib import sha1
+from PIL import ImageEnhance
+from fused_edits import adjust
+
+## The sliders, in the order their edits are applied
+SLIDERS = ["Contrast", "Brightness", "Sharpness", "Color"]
+
+## Pipeline stages: name, sliders it depends on, and the edit itself.
+## Contrast and brightness are fused into a single pass over the image.
+STAGES = [
+    ("Tone", ("Contrast", "Brightness"),
+     lambda img, f: adjust(img, contrast=f["Contrast"], brightness=f["Brightness"])),
+    ("Sharpness", ("Sharpness",),
+     lambda img, f: ImageEnhance.Sharpness(img).enhance(f["Sharpness"])),
+    ("Color", ("Color",),
+     lambda img, f: adjust(img, color=f["Color"])),
+]
+
+
+def stage_key(upstream_key, name, factors):
+    """A stage's output is identified by its input and its own factors"""
+    return sha1(f"{upstream_key}|{name}={factors}".encode()).hexdigest()
+
+
+class EditPipeline:
+    """Keeps the last output of every stage, keyed on the upstream key plus
+    the stage factors. Moving one slider only recomputes its stage and the
+    ones after it; moving the last one (Color) recomputes a single stage"""
+
+    def __init__(self):
+        self._outputs = {}  # stage name -> (key, image)
+
+    def run(self, source_key, load_source, factors):
+        names = ["Source"] + [name for name, _, _ in STAGES]
+        keys = [source_key]
+
+        for name, sliders, _ in STAGES:
+            keys.append(stage_key(keys[-1], name, tuple(factors[s] for s in sliders)))
+
+        ## Start from the last stage whose cached output is still valid
+        start, img = 0, None
+
+        for i in reversed(range(len(names))):
+            key, cached = self._outputs.get(names[i], (None, None))
+
+            if key == keys[i]:
+                start, img = i + 1, cached
+                break
+
+        if img is None:
+            img = load_source()
+            self._outputs["Source"] = (source_key, img)
+            start = 1
+
+        for i in range(start, len(names)):
+            _, sliders, edit = STAGES[i - 1]
+
+            ## Factors of 1.0 leave the image unchanged: skip the full pass
+            if any(factors[s] != 1.0 for s in sliders):
+                img = edit(img, factors)
+
+            self._outputs[names[i]] = (keys[i], img)
+
+        return img
@@ -0,0 +1,39 @@
+import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from PIL import Image
+from edit_pipeline import EditPipeline
+
+
+def render_full_resolution(data, factors):
+    """Applies the edits to the original upload and encodes it as a JPEG.
+    Runs on a fresh pipeline, so the session's preview stages are untouched"""
+
+    def load_source():
+        with Image.open(BytesIO(data)) as img:
+            return img.convert("RGB")
+
+    img = EditPipeline().run("export", load_source, factors)
+
+    with BytesIO() as buffer:
+        img.save(buffer, format="JPEG")
+        return buffer.getvalue()
+
+
+class ExportQueue:
+    """Full-resolution renders run on a worker pool, only when a download is
+    requested, so moving a slider never waits on the full image nor on the
+    JPEG encoder"""
+
+    def __init__(self, workers=2):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="exports")
+
+    def submit(self, data, factors):
+        return self._executor.submit(render_full_resolution, data, dict(factors))
+
+
+@st.cache_resource
+def get_export_queue():
+    """Full-resolution renders are rare and memory-hungry: a couple of workers
+    for the whole process caps how many run at once"""
+    return ExportQueue()
@@ -0,0 +1,82 @@
+import numpy as np
+from PIL import Image
+
+## Integer weights PIL uses to convert RGB to grayscale ("L"), out of 2**16
+L_WEIGHTS = np.array([19595, 38470, 7471], dtype=np.float32) / 65536
+
+
+def _truncate(tile):
+    """Image.blend clips to 0..255 and truncates to an integer after every
+    edit: do the same in place, so the next edit sees the same input"""
+    np.clip(tile, 0, 255, out=tile)
+    np.floor(tile, out=tile)
+
+
+def _gray(tile):
+    """Grayscale of an RGB tile, rounded like PIL's convert("L")"""
+    gray = tile @ L_WEIGHTS
+    gray += 0.5
+    return np.floor(gray, out=gray)
+
+
+def _gray_mean(arr, tile_rows):
+    """Mean grayscale value, as ImageEnhance.Contrast computes it"""
+    if arr.ndim == 2:
+        return int(arr.mean(dtype=np.float64) + 0.5)
+
+    total = 0.0
+
+    for start in range(0, arr.shape[0], tile_rows):
+        total += _gray(arr[start : start + tile_rows].astype(np.float32)).sum(dtype=np.float64)
+
+    return int(total / (arr.shape[0] * arr.shape[1]) + 0.5)
+
+
+def adjust(img, contrast=1.0, brightness=1.0, color=1.0, tile_rows=256):
+    """Applies contrast, then brightness, then colour saturation in a single
+    pass over tiles of `tile_rows` rows, with in-place float32 operations.
+    Matches the chained PIL ImageEnhance calls to within one level, without
+    allocating a full intermediate image nor a degenerate image per edit"""
+    if contrast == brightness == color == 1.0:
+        return img
+
+    if img.mode not in ("L", "RGB"):
+        img = img.convert("RGB")
+
+    arr = np.asarray(img)
+    out = np.empty_like(arr)
+    has_color = arr.ndim == 3
+
+    if contrast != 1.0:
+        mean = _gray_mean(arr, tile_rows)
+
+    buffer = np.empty((tile_rows, *arr.shape[1:]), dtype=np.float32)
+
+    for start in range(0, arr.shape[0], tile_rows):
+        rows = arr[start : start + tile_rows]
+        tile = buffer[: len(rows)]
+        np.copyto(tile, rows, casting="unsafe")
+
+        ## Contrast: blend with a flat image at the mean gray level
+        if contrast != 1.0:
+            tile -= mean
+            tile *= contrast
+            tile += mean
+            _truncate(tile)
+
+        ## Brightness: blend with a black image
+        if brightness != 1.0:
+            tile *= brightness
+            _truncate(tile)
+
+        ## Colour: blend with the grayscale version of the tile
+        if color != 1.0 and has_color:
+            gray = _gray(tile)[..., np.newaxis]
+            tile -= gray
+            tile *= color
+            tile += gray
+            _truncate(tile)
+
+        np.copyto(out[start : start + len(rows)], tile, casting="unsafe")
+
+    return Image.fromarray(out)
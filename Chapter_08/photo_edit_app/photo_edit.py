@@ -1,6 +1,11 @@
 import streamlit as st
-from PIL import Image, ImageEnhance
-from io import BytesIO
+from PIL import Image
+from edit_pipeline import EditPipeline, SLIDERS
+from export import get_export_queue
+
+## Edits are applied to a copy fitting this box: the photo column of the
+## centered layout is under 500px wide, so this stays sharp on HiDPI screens
+PREVIEW_SIZE = (960, 960)
 
 
 def main():
@@ -38,8 +43,21 @@ def main():
         ## Clear the uploader placeholder
         uploader_placeholder.empty()
 
-        ## Load image from uploaded file
-        img = Image.open(st.session_state.uploaded_file)
+        ## Each session keeps the output of every edit stage
+        if "pipeline" not in st.session_state:
+            st.session_state.pipeline = EditPipeline()
+
+        uploaded_file = st.session_state.uploaded_file
+
+        def load_preview():
+            ## Load a downscaled copy of the uploaded file. draft() lets the
+            ## JPEG decoder skip straight to a reduced scale
+            with Image.open(uploaded_file) as img:
+                img.draft("RGB", PREVIEW_SIZE)
+                img = img.convert("RGB")
+
+            img.thumbnail(PREVIEW_SIZE)
+            return img
 
         with tools_placeholder:
             ## Define image operations
@@ -50,32 +68,18 @@ def main():
                 step=0.01,
             )
 
-            contrast_factor = st.slider("Contrast", **slider_kwargs)
-            contrast = ImageEnhance.Contrast(img)
-            img = contrast.enhance(contrast_factor)
-
-            brightness_factor = st.slider("Brightness", **slider_kwargs)
-            brightness = ImageEnhance.Brightness(img)
-            img = brightness.enhance(brightness_factor)
+            factors = {name: st.slider(name, **slider_kwargs) for name in SLIDERS}
 
-            sharpness_factor = st.slider("Sharpness", **slider_kwargs)
-            sharpness = ImageEnhance.Sharpness(img)
-            img = sharpness.enhance(sharpness_factor)
+            ## Sharpness uses a fixed 3x3 kernel, so it looks stronger on the
+            ## downscaled preview than on the saved photo
+            st.caption("Sharpness is previewed at reduced size: the saved photo looks softer.")
 
-            color_factor = st.slider("Color", **slider_kwargs)
-            color = ImageEnhance.Color(img)
-            img = color.enhance(color_factor)
+            ## Only the stages after the slider that moved are recomputed
+            img = st.session_state.pipeline.run(uploaded_file.file_id, load_preview, factors)
 
-            ## Save the edited image
-            with BytesIO() as buffer:
-                img.save(buffer, format="JPEG")
-
-                download_col.download_button(
-                    "💾 Save",
-                    file_name="edited_photo.jpg",
-                    data=buffer.getvalue(),
-                    use_container_width=True,
-                )
+            ## The full-resolution JPEG is only rendered when asked for
+            with download_col:
+                render_download(uploaded_file, factors)
 
             ## Start all over button
             if restart_col.button("🗑️ Clear", use_container_width=True):
@@ -86,6 +90,55 @@ def main():
             st.image(img)
 
 
+def render_download(uploaded_file, factors):
+    """Save button: renders the full-resolution JPEG in the background, then
+    offers it for download"""
+    export = st.session_state.get("export")
+
+    ## The edits changed since the last render: it's out of date
+    if export is not None and export["factors"] != factors:
+        del st.session_state.export
+        export = None
+
+    if export is None:
+        if not st.button("💾 Save", use_container_width=True):
+            return
+
+        future = get_export_queue().submit(uploaded_file.getvalue(), factors)
+        export = st.session_state.export = {"factors": factors, "future": future}
+
+    future = export["future"]
+
+    if not future.done():
+        wait_for_export()
+        return
+
+    if future.exception() is not None:
+        del st.session_state.export
+        st.error("Export failed, try again", icon=":material/error:")
+        return
+
+    st.download_button(
+        "📥 Download",
+        file_name="edited_photo.jpg",
+        data=future.result(),
+        mime="image/jpeg",
+        use_container_width=True,
+    )
+
+
+@st.fragment(run_every="1s")
+def wait_for_export():
+    """Only rendered while a render is pending: polls it without rerunning
+    the app, then reruns it once to show the download button"""
+    export = st.session_state.get("export")
+
+    if export is None or export["future"].done():
+        st.rerun()
+
+    st.button("⏳ Rendering...", disabled=True, use_container_width=True)
+
+
 @st.dialog("Are you sure?")
 def show_confirmation_dialog():
     yes_col, no_col = st.columns((1.5, 1))
@@ -103,6 +156,8 @@ def show_confirmation_dialog():
 
 def clear_uploader():
     del st.session_state.uploaded_file
+    del st.session_state.pipeline
+    st.session_state.pop("export", None)
 
 
 if __name__ == "__main__":